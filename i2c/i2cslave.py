@@ -10,8 +10,15 @@
 # Supports only 7-bit addresses, and reads and writes in bulks.
 # Does not support RPC, transactions, or any other weird stuff.
 #
-# Due to Python limitations it does NOT support interrupts or IRQs.
-# The use of DMA is future work.
+# MicroPython can not attach handlers to the I²C peripheral IRQ, so the
+# register-map mode (startRegs) services the FIFOs from a hard Timer IRQ.
+# The heap is locked there, so the IRQ only uses register addresses that
+# were computed in startRegs (the peripheral addresses are above the
+# small-int range and would allocate a long int on every access).
+# Master writes are moved by a DMA channel (rp2.DMA) from the Rx FIFO into
+# a ring of 32-bit words, the IRQ only parses them; without rp2.DMA the IRQ
+# drains the Rx FIFO itself. With RX_FIFO_FULL_HLD_CTRL set, the slave
+# stretches the clock instead of dropping bytes while it waits for service.
 #
 # Stand-Alone testing:
 # Connect GPIO0 to GPIO2
@@ -72,6 +79,21 @@ __IC_CLR_RESTART_DET    = 0xa8 # Clear RESTART_DET Interrupt Register
 __IC_COMP_PARAM_1       = 0xf4 # Component Parameter Register 1
 __IC_COMP_VERSION       = 0xf8 # I²C Component Version Register
 __IC_COMP_TYPE          = 0xfc # I²C Component Type Register
+__IC_CON_RX_HOLD        = 0x0200 # IC_CON.RX_FIFO_FULL_HLD_CTRL
+__INTR_RD_REQ           = 0x0020 # IC_RAW_INTR_STAT.RD_REQ
+__INTR_STOP_DET         = 0x0200 # IC_RAW_INTR_STAT.STOP_DET
+__DATA_FIRST_BYTE       = 0x0800 # IC_DATA_CMD.FIRST_DATA_BYTE
+__FIFO_DEPTH            = 16
+__IC_DMA_CR_RDMAE       = 0x0001 # IC_DMA_CR.RDMAE
+__DMA_BASE              = 0x50000000 # DMA registers base address
+__DMA_CH_STRIDE         = 0x40
+__DMA_CH_WRITE_ADDR     = 0x04
+__DMA_CH_AL1_CTRL       = 0x10
+__DMA_CH_AL1_COUNT_TRIG = 0x1c # AL1_TRANS_COUNT_TRIG
+__DMA_CTRL_BUSY         = 0x01000000
+__DMA_COUNT             = 0xffffffff
+__DREQ_I2C0_RX          = 33
+__DREQ_I2C1_RX          = 35
 
 class I2CSlave():
 #'''
@@ -306,9 +328,177 @@ class I2CSlave():
 		# Wait until data arrives
 		IC_DATA_CMD & 0x000000ff
 	# end def
+
+	def startRegs(self, regs=256, ringSize=64, freq=2000, dma=True, dmaWords=64):
+		#'''Register-map mode, serviced from a hard Timer IRQ.
+		#   The master writes [reg, data...] and reads from the register
+		#   set by its last write, both with auto-increment.
+		#   Written register indices are queued in a ring buffer,
+		#   see changed() and awaitChanged().
+		#   dma=True moves the Rx FIFO into a ring of dmaWords words
+		#   (power of two, at most 8192) with rp2.DMA, if available.'''
+		if not self.__initialized: raise IOError('Uninitialized')
+		import uasyncio
+		self.regs = bytearray(regs) if isinstance(regs, int) else regs
+		self._ring = bytearray(ringSize)
+		self._ringHead = 0
+		self._ringTail = 0
+		self.overruns = 0
+		self._ptr = 0          # register pointer set by the master
+		self._txPos = 0        # next register to send in the current read
+		self._flag = uasyncio.ThreadSafeFlag()
+
+		# Absolute addresses for the IRQ, see the header comment
+		base = self._base
+		self._aDataCmd  = base | __IC_DATA_CMD
+		self._aRxflr    = base | __IC_RXFLR
+		self._aTxflr    = base | __IC_TXFLR
+		self._aRawIntr  = base | __IC_RAW_INTR_STAT
+		self._aClrStop  = base | __IC_CLR_STOP_DET
+		self._aClrAbrt  = base | __IC_CLR_TX_ABRT
+		self._aClrRdReq = base | __IC_CLR_RD_REQ
+
+		self.__regClr(__IC_ENABLE, 0x0001)
+		self.__regSet(__IC_CON, __IC_CON_RX_HOLD)
+		self.__regSet(__IC_ENABLE, 0x0001)
+
+		self._dma = None
+		if dma:
+			try:
+				self.__startDma(dmaWords)
+			except (ImportError, AttributeError):
+				self._dma = None   # no rp2.DMA in this firmware: FIFO polling
+
+		try:
+			self._timer = machine.Timer(freq=freq, callback=self._service, hard=True)
+		except TypeError:
+			self._timer = machine.Timer(freq=freq, callback=self._service)
+	# end def
+
+	def __startDma(self, words):
+		import rp2, uctypes
+		size = words * 4
+		bits = 2
+		while (1 << bits) < size: bits += 1
+		if (1 << bits) != size or bits > 15:
+			raise ValueError('dmaWords must be a power of two <= 8192')
+		# The DMA write ring must be aligned to its size
+		self._dmaBuf = bytearray(2 * size)
+		addr = uctypes.addressof(self._dmaBuf)
+		self._dmaStart = (addr + size - 1) & ~(size - 1)
+		self._dmaEnd = self._dmaStart + size
+		self._dmaTail = self._dmaStart
+
+		dma = rp2.DMA()
+		ch = __DMA_BASE + __DMA_CH_STRIDE * dma.channel
+		self._aDmaWrite = ch + __DMA_CH_WRITE_ADDR
+		self._aDmaCtrl  = ch + __DMA_CH_AL1_CTRL
+		self._aDmaCount = ch + __DMA_CH_AL1_COUNT_TRIG
+		dreq = __DREQ_I2C0_RX if self._base == __I2C0_BASE else __DREQ_I2C1_RX
+		ctrl = dma.pack_ctrl(size=2, inc_read=False, inc_write=True,
+			ring_sel=True, ring_size=bits, treq_sel=dreq)
+		dma.config(read=self._aDataCmd, write=self._dmaStart,
+			count=__DMA_COUNT, ctrl=ctrl, trigger=True)
+		self._dma = dma
+
+		self.__regWrite(__IC_DMA_RDLR, 0)
+		self.__regSet(__IC_DMA_CR, __IC_DMA_CR_RDMAE)
+	# end def
+
+	def stopRegs(self):
+		self._timer.deinit()
+		self.__regClr(__IC_ENABLE, 0x0001)
+		if self._dma is not None:
+			self.__regClr(__IC_DMA_CR, __IC_DMA_CR_RDMAE)
+			self._dma.close()
+			self._dma = None
+		self.__regClr(__IC_CON, __IC_CON_RX_HOLD)
+		self.__regSet(__IC_ENABLE, 0x0001)
+	# end def
+
+	def _rxWord(self, d):
+		# One IC_DATA_CMD word written by the master; True if a register changed
+		if d & __DATA_FIRST_BYTE:
+			self._ptr = d & 0xff
+			self._txPos = self._ptr
+			return False
+		self.regs[self._ptr] = d & 0xff
+		ring = self._ring
+		head = (self._ringHead + 1) % len(ring)
+		if head == self._ringTail: self.overruns += 1
+		else:
+			ring[self._ringHead] = self._ptr
+			self._ringHead = head
+		self._ptr = (self._ptr + 1) % len(self.regs)
+		self._txPos = self._ptr
+		return True
+	# end def
+
+	def _service(self, t=None):
+		# Hard IRQ: no allocations, only the addresses prepared in startRegs
+		mem32 = machine.mem32
+		written = False
+
+		# Master writes: the first byte after the address is the register pointer
+		if self._dma is not None:
+			tail = self._dmaTail
+			head = mem32[self._aDmaWrite]
+			while tail != head:
+				if self._rxWord(mem32[tail] & 0xfff): written = True
+				tail += 4
+				if tail == self._dmaEnd: tail = self._dmaStart
+			self._dmaTail = tail
+			if not mem32[self._aDmaCtrl] & __DMA_CTRL_BUSY:
+				mem32[self._aDmaCount] = __DMA_COUNT   # re-arm after 2**32 words
+		else:
+			n = mem32[self._aRxflr] & 0x1f
+			while n:
+				if self._rxWord(mem32[self._aDataCmd] & 0xfff): written = True
+				n -= 1
+				if not n: n = mem32[self._aRxflr] & 0x1f
+
+		raw = mem32[self._aRawIntr]
+		if raw & __INTR_STOP_DET:
+			mem32[self._aClrStop]
+			self._txPos = self._ptr
+
+		# Master reads: fill the Tx FIFO from the register map. Bytes that are
+		# not clocked out get flushed by the TX_ABRT on the master's NACK.
+		if raw & __INTR_RD_REQ:
+			mem32[self._aClrAbrt]
+			mem32[self._aClrRdReq]
+			regs = self.regs
+			size = len(regs)
+			pos = self._txPos
+			k = __FIFO_DEPTH - (mem32[self._aTxflr] & 0x1f)
+			while k > 0:
+				mem32[self._aDataCmd] = regs[pos]
+				pos = (pos + 1) % size
+				k -= 1
+			self._txPos = pos
+
+		if written: self._flag.set()
+	# end def
+
+	def changed(self):
+		#'''Yields the register indices written by the master since the last call'''
+		ring = self._ring
+		while self._ringTail != self._ringHead:
+			reg = ring[self._ringTail]
+			self._ringTail = (self._ringTail + 1) % len(ring)
+			yield reg
+	# end def
+
+	async def awaitChanged(self):
+		#'''Waits until the master writes registers, returns their indices'''
+		while self._ringTail == self._ringHead:
+			await self._flag.wait()
+		return list(self.changed())
+	# end def
 # end class
 
 
+
 __running = True
 def main1():
 	import random, ustruct
@@ -346,6 +536,25 @@ def main0():
 		sleep_ms(1000)
 # end def
 
+def mainRegs():
+	import _thread, uasyncio
+	def master():
+		i2c = machine.I2C(1, sda=machine.Pin(2), scl=machine.Pin(3), freq=400_000)
+		while __running:
+			i2c.writeto_mem(0x55, 0x10, bytes([1, 2, 3, 4]))
+			print('[Master] regs 0x10..0x13:', i2c.readfrom_mem(0x55, 0x10, 4))
+			sleep_ms(1000)
+	_thread.start_new_thread(master, [])
+
+	i2c = I2CSlave(address=0x55)
+	i2c.startRegs(64)
+	async def loop():
+		while __running:
+			regs = await i2c.awaitChanged()
+			print('[Slave ] Master wrote registers:', regs)
+	uasyncio.run(loop())
+# end def
+
 if __name__ == '__main__':
 	try:
 		main0()
@@ -8,11 +8,18 @@ import io
 import binascii
 import random
 import re
+import select
 import struct
 import socket
-from micropython import const
 from collections import namedtuple
 
+try:
+    import micropython
+    from micropython import const
+except ImportError:  # host side, e.g. the masking benchmark
+    micropython = None
+    const = lambda x: x
+
 # Opcodes
 OP_CONT = const(0x0)
 OP_TEXT = const(0x1)
@@ -35,6 +42,54 @@ CLOSE_BAD_CONDITION = const(1011)
 URL_RE = re.compile(r'([A-Za-z]+)://([A-Za-z0-9\-\.]+)(?:\:([0-9]+))?(/.+)?')
 URI = namedtuple('URI', ('scheme', 'hostname', 'port', 'path'))
 
+def _mask_word(mask_bits):
+    # The 4 mask bytes as one native (little endian) 32 bit word
+    return mask_bits[0] | mask_bits[1] << 8 | mask_bits[2] << 16 | mask_bits[3] << 24
+
+def mask_generator(data, mask_bits):
+    # Reference implementation, allocates a new buffer
+    return bytes(b ^ mask_bits[i % 4] for i, b in enumerate(data))
+
+# Bytes XORed at once by mask_python, a multiple of the 4 byte mask
+_MASK_CHUNK = 64
+
+def mask_python(buf, length, mask_bits):
+    # In place, one chunk per iteration as a single (long) int XOR;
+    # the tail shorter than a chunk goes byte by byte
+    mv = memoryview(buf)
+    mask = int.from_bytes(bytes(mask_bits[:4]) * (_MASK_CHUNK // 4), "little")
+    end = length - length % _MASK_CHUNK
+    for i in range(0, end, _MASK_CHUNK):
+        word = int.from_bytes(mv[i:i + _MASK_CHUNK], "little") ^ mask
+        mv[i:i + _MASK_CHUNK] = word.to_bytes(_MASK_CHUNK, "little")
+    for i in range(end, length):
+        mv[i] ^= mask_bits[i & 3]
+
+# @micropython.viper is handled by the compiler, micropython.viper does not
+# exist as an attribute, so just try to define it
+try:
+    @micropython.viper
+    def mask_viper(buf, length: int, mask: int):
+        # buf has to be word aligned, a bytearray from the heap always is
+        p = ptr32(buf)
+        words = length >> 2
+        for i in range(words):
+            p[i] ^= mask
+        b = ptr8(buf)
+        for i in range(words << 2, length):
+            b[i] ^= (mask >> ((i & 3) << 3)) & 0xff
+except (AttributeError, NameError):  # host side, micropython is None
+    mask_viper = None
+
+def apply_mask(buf, length, mask_bits):
+    """
+    XOR the first `length` bytes of the bytearray `buf` with the mask, in place.
+    """
+    if mask_viper is not None and isinstance(buf, bytearray):
+        mask_viper(buf, length, _mask_word(mask_bits))
+    else:
+        mask_python(buf, length, mask_bits)
+
 def urlparse(uri):
     match = URL_RE.match(uri)
     if match:
@@ -51,10 +106,24 @@ def urlparse(uri):
 class WebSocket(io.IOBase):
     is_client = False
 
+    # Grown on demand, reused for masking outgoing frames
+    _wbuff = None
+    # Grown on demand, word aligned buffer for unmasking in readinto
+    _rbuff = None
+    # Payload of the current data frame which readinto did not consume yet
+    _frame_left = 0
+    _frame_mask = None
+    _mask_pos = 0
+    # Payload byte counters and a callback for pong payloads, for telemetry
+    bytes_in = 0
+    bytes_out = 0
+    on_pong = None
+    # Poller for waiting on a non-blocking socket, created on first use
+    _poller = None
+
     def __init__(self, sock):
         self._sock = sock
         self.open = True
-        self._rbuff = None
 
     def __enter__(self):
         return self
@@ -65,10 +134,10 @@ class WebSocket(io.IOBase):
     def settimeout(self, timeout):
         self._sock.settimeout(timeout)
 
-    def read_frame(self, max_size=None):
+    def _read_header(self):
         fh = self._sock.read(2)
         if not fh:
-            return (None, None, None)
+            return None
         # Frame header
         byte1, byte2 = struct.unpack('!BB', fh)
 
@@ -81,26 +150,60 @@ class WebSocket(io.IOBase):
         length = byte2 & 0x7f
 
         if length == 126:  # Magic number, length header is 2 bytes
-            length, = struct.unpack('!H', self._sock.read(2))
+            length, = struct.unpack('!H', self._read_exactly(2))
         elif length == 127:  # Magic number, length header is 8 bytes
-            length, = struct.unpack('!Q', self._sock.read(8))
+            length, = struct.unpack('!Q', self._read_exactly(8))
 
+        mask_bits = None
         if mask:  # Mask is 4 bytes
-            mask_bits = self._sock.read(4)
+            mask_bits = self._read_exactly(4)
+
+        return fin, opcode, length, mask_bits
+
+    def read_frame(self, max_size=None):
+        header = self._read_header()
+        if header is None:
+            return (None, None, None)
+        fin, opcode, length, mask_bits = header
 
         try:
-            data = self._sock.read(length)
+            data = bytearray(length)
         except MemoryError:
             # We can't receive this many bytes, close the socket
             self.close(code=CLOSE_TOO_BIG)
             return True, OP_CLOSE, None
 
-        if mask:
-            data = bytes(b ^ mask_bits[i % 4]
-                         for i, b in enumerate(data))
+        self._read_into(memoryview(data), length)
+
+        if mask_bits:
+            apply_mask(data, length, mask_bits)
 
+        self.bytes_in += length
         return fin, opcode, data
 
+    def _read_exactly(self, length):
+        data = bytearray(length)
+        self._read_into(memoryview(data), length)
+        return data
+
+    def _read_into(self, mv, length):
+        pos = 0
+        while pos < length:
+            n = self._sock.readinto(mv[pos:length])
+            if n is None:
+                self._wait_readable()  # non-blocking socket, not ready yet
+                continue
+            if not n:
+                raise ValueError("connection closed")
+            pos += n
+
+    def _wait_readable(self):
+        # Sleep in poll() instead of spinning on readinto()
+        if self._poller is None:
+            self._poller = select.poll()
+            self._poller.register(self._sock, select.POLLIN)
+        self._poller.poll()
+
     def write_frame(self, opcode, data=b''):
         fin = True
         mask = self.is_client  # messages sent by client are masked
@@ -134,12 +237,32 @@ class WebSocket(io.IOBase):
             mask_bits = struct.pack('!I', random.getrandbits(32))
             self._sock.write(mask_bits)
 
-            data = bytes(b ^ mask_bits[i % 4]
-                         for i, b in enumerate(data))
+            if self._wbuff is None or len(self._wbuff) < length:
+                self._wbuff = bytearray(max(length, 64))
+            buf = self._wbuff
+            buf[:length] = data
+            apply_mask(buf, length, mask_bits)
+            data = memoryview(buf)[:length]
 
         self._sock.write(data)
+        self.bytes_out += length
+
+    def _control_frame(self, opcode, data):
+        # Returns False when the connection got closed
+        if opcode == OP_CLOSE:
+            self._close()
+            return False
+        elif opcode == OP_PING:
+            # We need to send a pong frame
+            self.write_frame(OP_PONG, data)
+        elif opcode == OP_PONG and self.on_pong:
+            self.on_pong(data)
+        # Otherwise ignore this frame, keep waiting for a data frame
+        return True
 
     def recv(self):
+        fragments = None
+        message_opcode = None
         while self.open:
             try:
                 fin, opcode, data = self.read_frame()
@@ -149,30 +272,31 @@ class WebSocket(io.IOBase):
                 self._close()
                 return
 
-            if not fin:
-                raise NotImplementedError()
-
-            if opcode == OP_TEXT:
-                return data.decode('utf-8')
-            elif opcode == OP_BYTES:
-                return data
-            elif opcode == OP_CLOSE:
-                self._close()
-                return
-            elif opcode == OP_PONG:
-                # Ignore this frame, keep waiting for a data frame
-                continue
-            elif opcode == OP_PING:
-                # We need to send a pong frame
-                self.write_frame(OP_PONG, data)
-                # And then wait to receive
+            if opcode >= OP_CLOSE:
+                # Control frames may be interleaved with fragments
+                if not self._control_frame(opcode, data):
+                    return
                 continue
-            elif opcode == OP_CONT:
+
+            if opcode == OP_CONT:
                 # This is a continuation of a previous frame
-                raise NotImplementedError(opcode)
+                if fragments is None:
+                    raise ValueError(opcode)
+                fragments.append(data)
+            elif opcode in (OP_TEXT, OP_BYTES):
+                message_opcode = opcode
+                fragments = [data]
             else:
                 raise ValueError(opcode)
 
+            if not fin:
+                continue
+
+            data = fragments[0] if len(fragments) == 1 else b''.join(fragments)
+            if message_opcode == OP_TEXT:
+                return str(data, 'utf-8')
+            return data
+
     def ping(self, data=b''):
         assert self.open
         self.write_frame(OP_PING, data)
@@ -194,17 +318,65 @@ class WebSocket(io.IOBase):
         return len(buf)
 
     def readinto(self, buf):
-        if not self._rbuff or not len(self._rbuff):
-            self._rbuff = self.recv()
-            if isinstance(self._rbuff, str):
-                self._rbuff = self._rbuff.encode()
-        if self._rbuff:
-            n = min(len(buf), len(self._rbuff))
-            #print(repr(self._rbuff))
-            buf[:n] = self._rbuff[:n]
-            self._rbuff = self._rbuff[n:]
+        """
+        Streams the payload of data frames straight into `buf`, frame by
+        frame, so a message never has to fit into the heap as a whole.
+        Fragmented messages are just consecutive frames here.
+        """
+        mv = memoryview(buf)
+        while self.open and not self._frame_left:
+            try:
+                header = self._read_header()
+                if header is None:
+                    return None
+                fin, opcode, length, mask_bits = header
+
+                if opcode >= OP_CLOSE:
+                    data = self._read_exactly(length)
+                    if mask_bits:
+                        apply_mask(data, length, mask_bits)
+                    self.bytes_in += length
+                    if not self._control_frame(opcode, data):
+                        return None
+                    continue
+            except ValueError:
+                self._close()
+                return None
+
+            if opcode not in (OP_CONT, OP_TEXT, OP_BYTES):
+                raise ValueError(opcode)
+
+            self._frame_left = length
+            self._frame_mask = mask_bits
+            self._mask_pos = 0
+
+        if not self._frame_left:
+            return None
+
+        want = min(len(mv), self._frame_left)
+        if self._frame_mask and mask_viper is not None:
+            # buf may start anywhere, mask_viper needs a word aligned buffer
+            if self._rbuff is None or len(self._rbuff) < want:
+                self._rbuff = bytearray(max(want, 64))
+            dst = self._rbuff
+            n = self._sock.readinto(memoryview(dst)[:want])
+        else:
+            dst = mv
+            n = self._sock.readinto(mv[:want])
+        if not n:
             return n
-        return None
+
+        if self._frame_mask:
+            off = self._mask_pos & 3
+            mask_bits = self._frame_mask[off:] + self._frame_mask[:off]
+            apply_mask(dst, n, mask_bits)
+            self._mask_pos += n
+            if dst is not mv:
+                mv[:n] = memoryview(dst)[:n]
+
+        self._frame_left -= n
+        self.bytes_in += n
+        return n
 
     def ioctl(self, kind, arg):
         if kind == 4:
@@ -1,6 +1,8 @@
 # REPL over a Secure WebSocket Relay
 
 import os
+import time
+import struct
 import machine
 import ws_client
 
@@ -21,6 +23,104 @@ except Exception:
     ssl_ctx = None
     _default_url = _default_url.replace("wss://", "ws://")
 
+# Telemetry
+_RTT_SLOTS = 8
+_STATUS_FMT = "<BBHHHHHHII"
+STATUS_VERSION = 1
+
+_rtt = [0] * _RTT_SLOTS     # last round trip times in ms, 0 = no sample yet
+_rtt_idx = 0
+_reconnects = 0             # successful reconnects after a failed ping
+_reconnect_fails = 0
+_down_since = None          # ticks_ms when the link was lost
+_last_down_ms = 0           # duration of the last outage
+_total_down_ms = 0
+_window_start = time.ticks_ms()
+_window_in = 0              # byte counters at the start of the minute
+_window_out = 0
+_per_min_in = 0             # bytes in the last full minute
+_per_min_out = 0
+_bytes_in = 0               # totals of closed connections
+_bytes_out = 0
+
+def _on_pong(data):
+    global _rtt_idx
+    if len(data) != 4:
+        return
+    sent, = struct.unpack("<I", data)
+    _rtt[_rtt_idx] = max(1, time.ticks_diff(time.ticks_ms(), sent))
+    _rtt_idx = (_rtt_idx + 1) % _RTT_SLOTS
+
+def _ping():
+    client_s.ping(struct.pack("<I", time.ticks_ms()))
+
+def _totals():
+    if client_s:
+        return _bytes_in + client_s.bytes_in, _bytes_out + client_s.bytes_out
+    return _bytes_in, _bytes_out
+
+def _roll_window():
+    global _window_start, _window_in, _window_out, _per_min_in, _per_min_out
+    now = time.ticks_ms()
+    elapsed = time.ticks_diff(now, _window_start)
+    if elapsed < 60 * 1000:
+        return
+    total_in, total_out = _totals()
+    _per_min_in = (total_in - _window_in) * 60000 // elapsed
+    _per_min_out = (total_out - _window_out) * 60000 // elapsed
+    _window_start, _window_in, _window_out = now, total_in, total_out
+
+def _link_down():
+    global _down_since
+    if _down_since is None:
+        _down_since = time.ticks_ms()
+
+def _link_up():
+    global _down_since, _last_down_ms, _total_down_ms
+    if _down_since is not None:
+        _last_down_ms = time.ticks_diff(time.ticks_ms(), _down_since)
+        _total_down_ms += _last_down_ms
+        _down_since = None
+
+def status():
+    """
+    Link telemetry: rolling RTT (ms), reconnects and outage durations (ms),
+    bytes per minute in both directions.
+    """
+    _roll_window()
+    samples = [r for r in _rtt if r]
+    total_in, total_out = _totals()
+    return {
+        "connected": client_s is not None and client_s.open and _down_since is None,
+        "rtt_last": _rtt[(_rtt_idx - 1) % _RTT_SLOTS],
+        "rtt_avg": sum(samples) // len(samples) if samples else 0,
+        "rtt_min": min(samples) if samples else 0,
+        "rtt_max": max(samples) if samples else 0,
+        "reconnects": _reconnects,
+        "reconnect_fails": _reconnect_fails,
+        "last_down_ms": _last_down_ms,
+        "total_down_ms": _total_down_ms,
+        "in_per_min": _per_min_in,
+        "out_per_min": _per_min_out,
+        "bytes_in": total_in,
+        "bytes_out": total_out,
+    }
+
+def status_frame():
+    """
+    The same as status() packed into 22 bytes (little endian):
+    version, connected, rtt last/avg/min/max, reconnects, reconnect fails,
+    in/out bytes per minute. Durations are left to status().
+    """
+    st = status()
+    clamp = lambda v: min(v, 0xffff)
+    return struct.pack(_STATUS_FMT, STATUS_VERSION, int(st["connected"]),
+                       clamp(st["rtt_last"]), clamp(st["rtt_avg"]),
+                       clamp(st["rtt_min"]), clamp(st["rtt_max"]),
+                       clamp(st["reconnects"]), clamp(st["reconnect_fails"]),
+                       min(st["in_per_min"], 0xffffffff),
+                       min(st["out_per_min"], 0xffffffff))
+
 def _curious_base24(n, length):
     # Base 24 alphabet avoiding visually similar or inappropriate characters
     alphabet = "0W8N4Y1HP5DF9K6JM3C2XA7R"
@@ -42,17 +142,25 @@ def generate_uid():
     return num[0:4]+"-"+num[4:8]+"-"+num[8:12]
 
 def _hbeat(tmr):
-    global client_s, _uid, _url
+    global client_s, _uid, _url, _reconnects, _reconnect_fails
+    global _bytes_in, _bytes_out
     if not _url:
         return
 
+    _roll_window()
     try:
-        client_s.ping()
+        _ping()
     except Exception:
+        _link_down()
+        if client_s:
+            _bytes_in += client_s.bytes_in
+            _bytes_out += client_s.bytes_out
+            client_s = None
         try:
             _start(_uid, _url)
+            _reconnects += 1
         except Exception:
-            pass
+            _reconnect_fails += 1
     finally:
         timer_hb.init(mode=timer_hb.ONE_SHOT, period=50*1000, callback=_hbeat)
 
@@ -64,6 +172,8 @@ def _start(uid=None, url=_default_url):
     timer_hb.init(mode=timer_hb.ONE_SHOT, period=50*1000, callback=_hbeat)
 
     client_s = ws_client.connect(url + "/new/" + uid, ssl=ssl_ctx)
+    client_s.on_pong = _on_pong
+    _link_up()
 
     client_s._sock.setblocking(False)
     # Notify REPL on socket incoming data
@@ -86,6 +196,7 @@ def start(uid=None, url=_default_url):
             lnk = url + "/" + _uid
             print("Remote REPL available on", lnk)
     except Exception:
+        _link_down()
         print("Unable to provide remote REPL, will retry periodically")
     return lnk
 
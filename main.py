@@ -11,7 +11,7 @@ async def main():
     sr1 = AsyncStepper(en_pin=Pin(2, Pin.OUT, drive=Pin.DRIVE_3),
                        step_pin=Pin(16, Pin.OUT, drive=Pin.DRIVE_3),
                        dir_pin=Pin(4, Pin.OUT, drive=Pin.DRIVE_3),
-                       steps_per_sec=5000, invert_enable=True)
+                       steps_per_sec=5000, invert_enable=True, accel=20000)
     try:
         while True:
             await asyncio.sleep(1e-3)
@@ -1,7 +1,8 @@
 import network
-import socket
 import time
+import uasyncio as asyncio
 from machine import Pin
+from tcp_link import TcpClient, TcpServer
 
 PORT = 5421
 MASTER = '192.168.0.123'
@@ -21,43 +22,42 @@ def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
         else: raise Exception("WiFi connect failed")
     return sta.ifconfig()[0]
 
-def run_slave():
-    addr = socket.getaddrinfo('0.0.0.0', PORT)[0][-1]
-    s = socket.socket(); s.bind(addr); s.listen(1)
-    print('Slave listening on', addr)
+# Команды: 1 байт кода, ответ - 1 байт статуса
+CMD_OFF = 0; CMD_ON = 1
+OK = 0; UNKNOWN = 1
+
+def handle(payload):
+    cmd = payload[0] if payload else None
+    if cmd == CMD_ON: led.value(1)
+    elif cmd == CMD_OFF: led.value(0)
+    else: return bytes((UNKNOWN,))
+    return bytes((OK,))
+
+async def run_slave():
+    server = TcpServer(PORT, handle)
+    await server.start()
+    while True: await asyncio.sleep(3600)
+
+async def watch_button(client):
+    flag = asyncio.ThreadSafeFlag()
+    button.irq(lambda p: flag.set(), Pin.IRQ_FALLING | Pin.IRQ_RISING)
+    pressed = False
     while True:
-        cl, addr = s.accept()
-        print('Master connected from', addr)
+        await flag.wait()
+        await asyncio.sleep_ms(20)  # дребезг
+        now = button.value() == 0
+        if now == pressed: continue
+        pressed = now
+        cmd = CMD_ON if now else CMD_OFF
         try:
-            while True:
-                data = cl.recv(1024)
-                if not data: break
-                cmd = data.decode().strip()
-                print('Received command:', cmd)
-                if cmd == "ON":
-                    led.value(1); cl.send(b"OK: LED ON")
-                elif cmd == "OFF":
-                    led.value(0); cl.send(b"OK: LED OFF")
-                else: cl.send(b"ERROR: Unknown command")
+            resp = await client.request(bytes((cmd,)))
+            print("Sent:", cmd, "Response:", resp[0])
         except Exception as e: print("Error:", e)
-        finally: cl.close()
-
-def button_pressed(): return button.value() == 0
 
-def run_master():
-    s = socket.socket(); s.connect((SLAVE, PORT))
-    print(f"Connected to slave at {SLAVE}:{PORT}")
-    try:
-        while True:
-            time.sleep_ms(50)
-            if button_pressed():
-                cmd = "ON"; print("Sending:", cmd); s.send(cmd.encode())
-                response = s.recv(1024); print("Response:", response.decode())
-                while button_pressed(): time.sleep_ms(50)
-                cmd = "OFF"; print("Sending:", cmd); s.send(cmd.encode())
-                response = s.recv(1024); print("Response:", response.decode())
-    except Exception as e: print("Error:", e)
-    finally: s.close()
+async def run_master():
+    client = TcpClient(SLAVE, PORT)
+    client.start()
+    await watch_button(client)
 
 
 sta = network.WLAN(network.STA_IF)
@@ -65,5 +65,4 @@ if not sta.isconnected():
     connect_wifi("TP-Link_0D14", "24827089")
 net = sta.ifconfig()[0]
 ROLE = "MASTER" if net == MASTER else "SLAVE"
-if ROLE == "MASTER": run_master()
-else: run_slave()
+asyncio.run(run_master() if ROLE == "MASTER" else run_slave())
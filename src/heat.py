@@ -1,6 +1,8 @@
 from machine import Pin
-import onewire, ds18x20
+import onewire
+import math
 import time
+from thermal import SensorBus
 
 class PID:
     def __init__(self, kp, ki, kd, setpoint=0, output_limits=(0, 100)):
@@ -41,18 +43,19 @@ pid = PID(kp=1.5, ki=0.3, kd=2, setpoint=TARGET_TEMP)
 # kp = 1; ki = 0.2; kd = 1.5 # супер мягкий долгий  
 
 PWM_PERIOD = 2.0 
-ow = onewire.OneWire(sensor_pin)
-ds = ds18x20.DS18X20(ow)
-roms = ds.scan()
-if not roms: raise Exception("DS18B20 not found!")
-rom = roms[0]; print("Sensor:", rom)
+bus = SensorBus(sensor_pin, resolution=11)  # 375 мс на конверсию
+print("Sensors:", bus.roms)
 last_time = time.ticks_ms()
 
 while True:
     try:
-        ds.convert_temp()
-        time.sleep_ms(500)
-        temp = ds.read_temp(rom)
+        temp = bus.read()[0]
+        if math.isnan(temp):        # датчик не ответил - греть вслепую нельзя
+            heater.off()
+            print("\rSensor error, heater off        ", end="")
+            time.sleep(PWM_PERIOD)
+            last_time = time.ticks_ms()
+            continue
         now = time.ticks_ms()
         dt = (time.ticks_diff(now, last_time)) / 1000
         last_time = now
@@ -1,6 +1,19 @@
-from machine import Pin
-import onewire, ds18x20
+from machine import Pin, PWM, Timer
+import uasyncio as asyncio
+import ujson as json
+import math
 import time
+from thermal import SensorBus
+
+GAINS_FILE = 'pid.json'
+MODEL_FILE = 'model.json'   # коэффициенты модели, tools/fopdt_fit.py на ПК
+
+# Правила настройки по Ku и Tu: kp = a*Ku, Ti = b*Tu, Td = c*Tu
+TUNING_RULES = {
+    'classic':        (0.6, 0.5, 0.125),   # Зиглер-Никольс, с перерегулированием
+    'some_overshoot': (0.33, 0.5, 0.33),
+    'no_overshoot':   (0.2, 0.5, 0.33),
+}
 
 class PID:
     def __init__(self, kp, ki, kd, setpoint=0, output_limits=(0, 100)):
@@ -29,75 +42,337 @@ class PID:
         return output
 
 
+def relay_gains(amplitude, period, relay_d, hyst=0, rule='no_overshoot'):
+    """Коэффициенты PID по релейному эксперименту (Острём-Хэгглунд)"""
+    a = math.sqrt(max(amplitude ** 2 - hyst ** 2, 1e-6))
+    ku = 4 * relay_d / (math.pi * a)
+    ka, kb, kc = TUNING_RULES[rule]
+    kp = ka * ku
+    return kp, kp / (kb * period), kp * kc * period
+
+
+class GainSchedule:
+    """
+    Коэффициенты по диапазонам температуры уставки:
+    bands = [(до_темп, kp, ki, kd), ...], последний диапазон - для всего выше
+    """
+    def __init__(self, bands):
+        self.bands = sorted(bands)
+
+    def gains(self, temp):
+        for band in self.bands:
+            if temp <= band[0]: return band[1:]
+        return self.bands[-1][1:]
+
+
+def load_gains(name):
+    try:
+        with open(GAINS_FILE) as f: return json.load(f).get(name)
+    except (OSError, ValueError): return None
+
+
+def save_gains(name, gains):
+    try:
+        with open(GAINS_FILE) as f: data = json.load(f)
+    except (OSError, ValueError): data = {}
+    data[name] = gains
+    with open(GAINS_FILE, 'w') as f: json.dump(data, f)
+
+
+class ThermalModel:
+    """
+    Модель первого порядка с запаздыванием (FOPDT):
+    tau * dT/dt = K * u(t - theta) - (T - ambient)
+    K - °C на 1% мощности, tau и theta - секунды
+    """
+    def __init__(self, K, tau, theta, ambient=20.0, **kwargs):
+        self.K, self.tau, self.theta, self.ambient = K, tau, theta, ambient
+
+    def power_for(self, ref, dref=0):
+        """Мощность, которая по модели ведёт температуру по ref со скоростью dref"""
+        return (ref - self.ambient + self.tau * dref) / self.K
+
+    @classmethod
+    def load(cls, name):
+        try:
+            with open(MODEL_FILE) as f: data = json.load(f).get(name)
+        except (OSError, ValueError): return None
+        return cls(**data) if data else None
+
+
+class SetpointPlan:
+    """
+    Плавный выход на уставку: экспонента с постоянной tau_cl, выбранной так,
+    чтобы опережающей мощности хватало (0..100%) - без перерегулирования.
+    """
+    def __init__(self, model, start, target, max_power=100):
+        self.start, self.target = start, target
+        self.t0 = time.ticks_ms()
+        m = model
+        span = abs(target - start)
+        # мощность в начале плана не выходит за пределы 0..max_power
+        if target > start: room = m.K * max_power - (start - m.ambient)
+        else: room = start - m.ambient
+        tau_cl = m.tau * span / room if room > 0 else m.tau
+        self.tau_cl = max(tau_cl * 1.2, m.theta, m.tau / 4, 1)
+
+    def at(self, t):
+        """(уставка, скорость) через t секунд от начала плана"""
+        e = (self.target - self.start) * math.exp(-t / self.tau_cl)
+        return self.target - e, e / self.tau_cl
+
+    def elapsed(self):
+        return time.ticks_diff(time.ticks_ms(), self.t0) / 1000
+
+
+class SlowPWM:
+    """
+    Медленный программный ШИМ на аппаратном таймере (для SSR, период секунды).
+    Таймер тикает steps раз за период, нагреватель включен первые duty тиков.
+    """
+    def __init__(self, pin, period=2.0, timer_id=0, steps=100):
+        self.pin = pin
+        self.steps = steps
+        self.duty = 0
+        self.tick = 0
+        self.timer = Timer(timer_id)
+        self.timer.init(period=max(1, int(period * 1000 / steps)),
+                        mode=Timer.PERIODIC, callback=self._tick)
+
+    def _tick(self, t):
+        self.tick = (self.tick + 1) % self.steps
+        self.pin.value(1 if self.tick < self.duty else 0)
+
+    def power(self, percent):
+        self.duty = int(self.steps * percent / 100)
+
+    def deinit(self):
+        self.timer.deinit()
+        self.pin.off()
+
+
+class HardPWM:
+    """Аппаратный ШИМ (LEDC), для нагрузок, которым подходит частота ≥ 1 Гц"""
+    def __init__(self, pin, freq=10):
+        self.pwm = PWM(pin, freq=freq, duty_u16=0)
+
+    def power(self, percent):
+        self.pwm.duty_u16(int(percent * 65535 / 100))
+
+    def deinit(self):
+        self.pwm.duty_u16(0)
+        self.pwm.deinit()
+
+
 class HeatingSystem:
     def __init__(self, sensor_pin, heater_pin, target_temp=40, 
-                 kp=1.5, ki=0.3, kd=2.0, pwm_period=2.0):
+                 kp=1.5, ki=0.3, kd=2.0, pwm_period=2.0, pwm_freq=None,
+                 timer_id=0, resolution=12, sensor=0, name='heater', log=None):
+        self.name = name
+        self.log = log                  # ThermalLog для истории замеров
+        self.target = target_temp
         self.pid = PID(kp, ki, kd, setpoint=target_temp)
+        self.schedule = None
+        self.load_gains()
+        self.model = None               # опережающее управление, см. set_model
+        self.plan = None
+        self.set_model(ThermalModel.load(name))
         # --- железо ---
-        self.sensor_pin = Pin(sensor_pin)
         self.heater = Pin(heater_pin, Pin.OUT)
         self.pwm_period = pwm_period
+        self.pwm_freq = pwm_freq        # None - медленный ШИМ на таймере
+        self.timer_id = timer_id
+        self.output = None
+        self.power = 0
         # --- датчик ---
-        ow = onewire.OneWire(self.sensor_pin)
-        self.ds = ds18x20.DS18X20(ow)
-        roms = self.ds.scan()
-        if not roms:
-            raise Exception("DS18B20 not found!")
-        self.rom = roms[0]
+        # sensor_pin - пин или общая SensorBus (несколько зон на одной шине),
+        # sensor - индекс датчика на шине
+        self.shared_bus = isinstance(sensor_pin, SensorBus)
+        self.bus = sensor_pin if self.shared_bus else SensorBus(sensor_pin, resolution)
+        self.sensor = sensor
 
         self.last_time = time.ticks_ms() # время
         self.running = False # статус
+        self._task = None
 
     def set_target(self, temp):
+        self.target = temp
         self.pid.setpoint = temp
+        self.plan = None                # с моделью план строится заново в цикле
+        self._apply_schedule()
+
+    def set_model(self, model):
+        """
+        ThermalModel включает опережающую мощность по модели и плавный выход на
+        уставку; PID только поправляет ошибку модели. None - чистый PID.
+        """
+        self.model = model
+        self.plan = None
+        self.pid.output_limits = (-100, 100) if model else (0, 100)
+        # план модели двигал setpoint по рампе - возвращаем уставку
+        self.pid.setpoint = self.target
+        self.pid.integral = 0
+        self.pid.last_error = None
 
     def set_pid(self, kp, ki, kd):
         self.pid.kp = kp
         self.pid.ki = ki
         self.pid.kd = kd
 
+    def set_schedule(self, bands):
+        """Планирование коэффициентов, см. GainSchedule; None - отключить"""
+        self.schedule = GainSchedule(bands) if bands else None
+        self._apply_schedule()
+
+    def _apply_schedule(self):
+        if self.schedule: self.set_pid(*self.schedule.gains(self.target))
+
+    def load_gains(self):
+        """Коэффициенты, сохранённые автонастройкой"""
+        saved = load_gains(self.name)
+        if not saved: return
+        self.set_pid(saved['kp'], saved['ki'], saved['kd'])
+        if saved.get('bands'): self.schedule = GainSchedule(saved['bands'])
+
+    def save_gains(self):
+        save_gains(self.name, {
+            'kp': self.pid.kp, 'ki': self.pid.ki, 'kd': self.pid.kd,
+            'bands': self.schedule.bands if self.schedule else None,
+        })
+
+    async def autotune(self, setpoint=None, relay_d=50, bias=50, hyst=0.3,
+                       cycles=4, rule='no_overshoot', timeout_s=3600, band=None):
+        """
+        Релейная автонастройка: нагреватель переключается bias±relay_d вокруг
+        уставки, по амплитуде и периоду колебаний считаются kp, ki, kd.
+        band - верхняя граница диапазона для планирования коэффициентов,
+        иначе коэффициенты становятся основными. Результат сохраняется.
+        """
+        if self.running: raise Exception('Остановите регулятор перед автонастройкой')
+        if cycles < 1: raise ValueError('cycles дб ≥ 1')
+        setpoint = self.target if setpoint is None else setpoint
+        self.output = self._create_output()
+        start = time.ticks_ms()
+        high = True
+        switches = []              # моменты переключения вниз (начало цикла)
+        peaks = []                 # (max, min) по циклам
+        t_max, t_min = -1000, 1000
+        try:
+            self.output.power(bias + relay_d)
+            while len(switches) <= cycles + 1:
+                if time.ticks_diff(time.ticks_ms(), start) > timeout_s * 1000:
+                    raise Exception('Автонастройка: нет колебаний')
+                try: temp = await self.read_temp()
+                except Exception: continue
+                t_max, t_min = max(t_max, temp), min(t_min, temp)
+
+                if high and temp > setpoint + hyst:
+                    high = False
+                    self.output.power(bias - relay_d)
+                    switches.append(time.ticks_ms())
+                    if len(switches) > 1: peaks.append((t_max, t_min))
+                    t_max, t_min = temp, temp
+                elif not high and temp < setpoint - hyst:
+                    high = True
+                    self.output.power(bias + relay_d)
+        finally:
+            self._off()
+
+        # первый цикл - выход на режим, его не учитываем
+        periods = [time.ticks_diff(switches[i + 1], switches[i]) / 1000
+                   for i in range(1, len(switches) - 1)]
+        period = sum(periods) / len(periods)
+        amplitude = sum((p[0] - p[1]) / 2 for p in peaks[1:]) / len(peaks[1:])
+        kp, ki, kd = relay_gains(amplitude, period, relay_d, hyst, rule)
+        print(f"Autotune: Tu={period:.1f}s a={amplitude:.2f}°C -> kp={kp:.3f} ki={ki:.4f} kd={kd:.2f}")
+
+        if band is None:
+            self.set_pid(kp, ki, kd)
+        else:
+            bands = [b for b in (self.schedule.bands if self.schedule else []) if b[0] != band]
+            self.schedule = GainSchedule(bands + [(band, kp, ki, kd)])
+            self._apply_schedule()
+        self.pid.integral = 0
+        self.pid.last_error = None
+        self.save_gains()
+        return kp, ki, kd
+
     def get_temp(self):
-        """Просто чтение температуры"""
-        self.ds.convert_temp()
-        time.sleep_ms(500)
-        return self.ds.read_temp(self.rom)
+        """Просто чтение температуры (для общей шины - последний замер)"""
+        if self.shared_bus: return self.bus.temps[self.sensor]
+        return self.bus.read()[self.sensor]
+
+    async def read_temp(self):
+        """
+        Чтение температуры без блокировки: ждём конверсию в планировщике.
+        Общую шину опрашивает её собственная задача (bus.start()).
+        """
+        if self.shared_bus: temps = await self.bus.wait()
+        else: temps = await self.bus.acquire()
+        temp = temps[self.sensor]
+        if temp != temp: raise ValueError('Ошибка чтения датчика')  # nan
+        return temp
+
+    def _create_output(self):
+        if self.pwm_freq: return HardPWM(self.heater, self.pwm_freq)
+        return SlowPWM(self.heater, self.pwm_period, self.timer_id)
 
     def start(self):
-        """Запускает основной цикл регулирования"""
-        self.running = True
-        self._loop()
+        """Запускает регулятор задачей asyncio, не блокируя плату"""
+        if self._task is None:
+            self.running = True
+            self._task = asyncio.create_task(self.run())
+        return self._task
 
     def stop(self):
         self.running = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._off()
+
+    def _off(self):
+        if self.output is not None:
+            self.output.deinit()
+            self.output = None
         self.heater.off()
 
-    def _loop(self):
-        """Внутренний цикл PID + PWM"""
-        while self.running:
-            try:
-                self.ds.convert_temp()
-                time.sleep_ms(500)
-                temp = self.ds.read_temp(self.rom)
+    async def run(self):
+        """Цикл PID: конверсия -> ожидание -> PID -> мощность на ШИМ"""
+        self.running = True
+        self.output = self._create_output()
+        self.last_time = time.ticks_ms()
+        if self.log: self.log.start()
+        try:
+            while self.running:
+                try:
+                    temp = await self.read_temp()
 
-                now = time.ticks_ms()
-                dt = time.ticks_diff(now, self.last_time) / 1000
-                self.last_time = now
+                    now = time.ticks_ms()
+                    dt = time.ticks_diff(now, self.last_time) / 1000
+                    self.last_time = now
 
-                power = self.pid.compute(temp, dt)
-                print(f"Temp={temp:.2f}°C  Power={power:.1f}%")
+                    self.power = self.compute_power(temp, dt)
+                    self.output.power(self.power)
+                    if self.log: self.log.add(temp, self.pid.setpoint, self.power)
+                    print(f"Temp={temp:.2f}°C  Power={self.power:.1f}%")
 
-                on_time = self.pwm_period * (power / 100)
-                off_time = self.pwm_period - on_time
+                except Exception:
+                    self.output.power(0)
+                    await asyncio.sleep_ms(self.bus.conv_ms)
+        finally:
+            self._off()
 
-                if on_time > 0:
-                    self.heater.on()
-                    time.sleep(on_time)
-                if off_time > 0:
-                    self.heater.off()
-                    time.sleep(off_time)
+    def compute_power(self, temp, dt):
+        if not self.model: return self.pid.compute(temp, dt)
 
-            except Exception:
-                self.heater.off()
+        if self.plan is None:
+            self.plan = SetpointPlan(self.model, temp, self.target)
+        t = self.plan.elapsed()
+        self.pid.setpoint, _ = self.plan.at(t)
+        # мощность подаётся с опережением на запаздывание объекта
+        ff = self.model.power_for(*self.plan.at(t + self.model.theta))
+        return min(100, max(0, ff + self.pid.compute(temp, dt)))
 
     @property
     def temp(self): return self.get_temp()
@@ -108,10 +383,11 @@ class HeatingSystem:
         else: raise ValueError('Неккоректное значение, дб 0 ≤ temp ≤ 120')
         
 
-def main():
+async def main():
     system = HeatingSystem(sensor_pin=13, heater_pin=15)
-    system.set_pid(kp=2.0, ki=0.4, kd=1.3)
+    if load_gains(system.name) is None:     # автонастройка ещё не проводилась
+        system.set_pid(kp=2.0, ki=0.4, kd=1.3)
     system.temp = 42
-    system.start()
+    await system.run()
 
-main()
\ No newline at end of file
+asyncio.run(main())
\ No newline at end of file
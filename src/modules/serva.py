@@ -1,5 +1,13 @@
 import time
 import machine
+import uasyncio as asyncio
+from array import array
+
+LUT_RES = 4         # ступеней таблицы на градус
+
+# S-кривая 3t² - 2t³ (плавный старт и остановка), 0..65535 на 256 точках
+EASE = array('H', [round(65535 * (3 * (k / 255) ** 2 - 2 * (k / 255) ** 3)) for k in range(256)])
+LINEAR = array('H', [round(65535 * k / 255) for k in range(256)])
 
 
 class Servo:
@@ -20,9 +28,27 @@ class Servo:
         self.min_deg = min_deg
         self.max_deg = max_deg
         self.current_us = 0.0
-        self._speed = speed  # °/сек
+        self.speed = speed  # °/сек, через сеттер с проверкой
         self._slope = (self.max_us - self.min_us) / (self.max_deg - self.min_deg)
         self._min_step_delay = 1e-2  # минимальный sleep в секундах (10 мс)
+        self.index = None            # текущая ступень lut (для ServoEngine)
+        self.build_lut()
+
+    def build_lut(self):
+        """Градусы -> duty_ns с шагом 1/LUT_RES°; пересчитать после смены калибровки"""
+        n = int((self.max_deg - self.min_deg) * LUT_RES) + 1
+        self._slope = (self.max_us - self.min_us) / (self.max_deg - self.min_deg)
+        self.lut = array('I', [int((self.min_us + i / LUT_RES * self._slope) * 1000) for i in range(n)])
+
+    def deg_to_index(self, deg):
+        deg = max(self.min_deg, min(self.max_deg, deg))
+        return round((deg - self.min_deg) * LUT_RES)
+
+    def write_index(self, i):
+        self.index = i
+        ns = self.lut[i]
+        self.current_us = ns / 1000
+        self.pwm.duty_ns(ns)
 
     @property
     def speed(self):
@@ -30,6 +56,7 @@ class Servo:
 
     @speed.setter
     def speed(self, value):
+        if value <= 0: raise ValueError("speed дб > 0")    # ServoEngine делит на неё
         self._speed = min(360, max(1, value))
 
     @property
@@ -44,6 +71,7 @@ class Servo:
         deg = max(self.min_deg, min(self.max_deg, deg))
         us = self.min_us + (deg - self.min_deg) * self._slope
         self.current_us = us
+        self.index = self.deg_to_index(deg)
         self.pwm.duty_ns(int(us * 1000))
 
     def off(self):
@@ -141,6 +169,111 @@ class Servo:
         return self
 
 
+class ServoEngine:
+    """
+    Плавные движения нескольких серв от одного таймера: каждые 1/rate_hz с
+    каждой движущейся сервы берётся следующая ступень lut по S-кривой.
+    Задача, вызвавшая move()/move_group(), спит до конца движения.
+
+    engine = ServoEngine(rate_hz=100)
+    await engine.move_group({gripper: 30, wrist: 120})   # закончат одновременно
+    """
+    def __init__(self, rate_hz=100, timer_id=1):
+        self.rate_hz = rate_hz
+        self.moves = []         # [servo, start, delta, tick, ticks, ease, flag, group]
+                                # group: [движется серв, прервано]
+        self.timer = machine.Timer(timer_id)
+        self.running = False
+
+    def _start(self):
+        if not self.running:
+            self.running = True
+            self.timer.init(freq=self.rate_hz, callback=self._tick)
+
+    def _tick(self, t):
+        moves = self.moves
+        i = 0
+        while i < len(moves):
+            m = moves[i]
+            m[3] += 1
+            k = m[3] * 255 // m[4]
+            m[0].write_index(m[1] + (m[2] * m[5][k] + 32767) // 65535)
+            if m[3] >= m[4]:
+                del moves[i]
+                m[7][0] -= 1
+                if not m[7][0]: m[6].set()    # вся группа на месте
+                continue
+            i += 1
+        if not moves:
+            self.timer.deinit()
+            self.running = False
+
+    def _ticks(self, servo, deg, duration_ms):
+        if servo.index is None: servo.write(deg)     # положение неизвестно - сразу в цель
+        end = servo.deg_to_index(deg)
+        if duration_ms is None:
+            duration_ms = abs(end - servo.index) * 1000 / (LUT_RES * servo.speed)
+        return end, max(1, int(duration_ms * self.rate_hz / 1000))
+
+    async def move_group(self, targets, duration_ms=None, ease=True):
+        """
+        targets: {servo: градусы}. Без duration_ms время берётся по самой
+        долгой серве (её speed), остальные идут медленнее и приходят вместе с ней.
+        Возвращает False, если движение прервали stop() или новой целью.
+        """
+        plan = []
+        ticks = 1
+        for servo, deg in targets.items():
+            end, n = self._ticks(servo, deg, duration_ms)
+            plan.append((servo, end))
+            ticks = max(ticks, n)
+
+        flag = asyncio.ThreadSafeFlag()
+        group = [0, False]
+        curve = EASE if ease else LINEAR
+        state = machine.disable_irq()
+        try:
+            for servo, end in plan:
+                for m in self.moves:        # новая цель отменяет прежнее движение сервы
+                    if m[0] is servo:
+                        self.moves.remove(m)
+                        m[7][1] = True
+                        m[7][0] -= 1
+                        if not m[7][0]: m[6].set()
+                        break
+                if end == servo.index: continue
+                self.moves.append([servo, servo.index, end - servo.index, 0, ticks, curve, flag, group])
+                group[0] += 1
+        finally:
+            machine.enable_irq(state)
+        if not group[0]: return True
+        self._start()
+        await flag.wait()
+        return not group[1]
+
+    async def move(self, servo, deg, duration_ms=None, ease=True):
+        return await self.move_group({servo: deg}, duration_ms, ease)
+
+    def stop(self):
+        """Останавливает все движения, ожидающие move() получат False"""
+        self.timer.deinit()
+        self.running = False
+        for m in self.moves:
+            m[7][1] = True
+            m[6].set()
+        self.moves = []
+
+
+
+async def sweep(pins=(13, 14)):
+    """Две сервы качаются навстречу и приходят в крайние точки одновременно"""
+    a, b = Servo(pins[0], speed=360), Servo(pins[1], speed=90)
+    a.write(0); b.write(180)
+    engine = ServoEngine(rate_hz=100)
+    while True:
+        await engine.move_group({a: 180, b: 0})
+        await engine.move_group({a: 0, b: 180})
+
 def main():
     with Servo(pin_id=13, speed=360) as servo:
         servo |= 0
@@ -1,6 +1,8 @@
 from machine import Pin
-import onewire, ds18x20
+import onewire
+import math
 import time
+from thermal import SensorBus
 
 TARGET_TEMP = 40
 HYST = 3
@@ -8,21 +10,22 @@ HYST = 3
 sensor_pin = Pin(13)
 heater = Pin(15, Pin.OUT)
 
-ds = ds18x20.DS18X20(onewire.OneWire(sensor_pin))
-roms = ds.scan()
-if not roms: raise Exception("DS18B20 not found!")
-print("Sensor:", roms[0])
+# при гистерезисе 3°C хватает 9 бит (0.5°C) - 94 мс на конверсию
+bus = SensorBus(sensor_pin, resolution=9)
+print("Sensors:", bus.roms)
 
 while True:
     try:
-        ds.convert_temp(); time.sleep(0.5)
-        temp = float(ds.read_temp(roms[0]))
+        temp = bus.read()[0]
+        if math.isnan(temp):        # ошибка датчика
+            heater.off()
+            continue
         print(f"\rTemperature: {temp:.2f}°C   ", end="")
         if temp < TARGET_TEMP - HYST:
             heater.on()
         elif temp > TARGET_TEMP + HYST:
             heater.off()
-    except onewire.OneWireError: pass
+    except onewire.OneWireError: heater.off()
 
 
 
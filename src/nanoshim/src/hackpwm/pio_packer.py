@@ -0,0 +1,144 @@
+# pio_packer.py
+"""
+Exact packer for the PIO instruction memory.
+
+The rp2040 has two PIO blocks, each with 4 state machines and 32 instruction
+slots. Identical assembled programs are loaded only once per PIO block and
+shared by all state machines of that block which run them.
+
+Every entry is `[program_idx, instructions, sub_idx]` with an optional 4th
+item `key`. Entries with an equal key run the same assembled program, entries
+without a key never share. All entries of one program_idx are placed into the
+same PIO block, because they talk to each other through the PIO local IRQs.
+"""
+
+PIO_BLOCKS = 2
+PIO_SM_COUNT = 4
+PIO_MEMORY = 32
+
+
+def program_key(program):
+    # The instructions plus the program config (execctrl, shiftctrl, pin init)
+    return (bytes(program[0]), repr(program[3:]))
+
+
+def _entry_key(entry):
+    return entry[3] if len(entry) > 3 else ("entry", entry[0], entry[2])
+
+
+def _group_units(entries):
+    units = {}
+    order = []
+    for entry in entries:
+        if entry[0] not in units:
+            units[entry[0]] = []
+            order.append(entry[0])
+        units[entry[0]].append(entry)
+
+    # largest units first, makes the bound prune early
+    return sorted([units[p] for p in order],
+                  key=lambda u: (sum(e[1] for e in u), len(u)), reverse=True)
+
+
+def _place(unit, block):
+    # returns the additional memory the unit needs in this block
+    added = 0
+    new_keys = {}
+    for entry in unit:
+        key = _entry_key(entry)
+        if key not in block["keys"] and key not in new_keys:
+            new_keys[key] = entry[1]
+            added += entry[1]
+
+    return added, new_keys
+
+
+def pack_pio(entries, blocks=PIO_BLOCKS, sm_count=PIO_SM_COUNT, memory=PIO_MEMORY):
+    """
+    Branch and bound over the (tiny) assignment space of programs to blocks.
+    Minimizes the loaded instructions first and the used blocks second.
+    Returns `[program_idx, instructions, sub_idx, sm_id]` entries sorted by
+    program_idx, raises ValueError if the programs do not fit.
+    """
+    units = _group_units(entries)
+    state = [{"keys": {}, "sms": 0, "used": 0, "units": []} for _ in range(blocks)]
+    best = {"cost": None, "assignment": None}
+
+    def search(idx, cost):
+        if best["cost"] is not None and cost > best["cost"][0]:
+            return
+
+        if idx == len(units):
+            score = (cost, sum(1 for b in state if b["sms"] > 0))
+            if best["cost"] is None or score < best["cost"]:
+                best["cost"] = score
+                best["assignment"] = [list(b["units"]) for b in state]
+            return
+
+        unit = units[idx]
+        tried_empty = False
+        for block in state:
+            if block["sms"] + len(unit) > sm_count:
+                continue
+
+            # all empty blocks are equal, trying one of them is enough
+            if block["sms"] == 0:
+                if tried_empty:
+                    continue
+                tried_empty = True
+
+            added, new_keys = _place(unit, block)
+            if block["used"] + added > memory:
+                continue
+
+            block["keys"].update(new_keys)
+            block["sms"] += len(unit)
+            block["used"] += added
+            block["units"].append(unit)
+
+            search(idx + 1, cost + added)
+
+            block["units"].pop()
+            block["used"] -= added
+            block["sms"] -= len(unit)
+            for key in new_keys:
+                del block["keys"][key]
+
+    search(0, 0)
+
+    if best["assignment"] is None:
+        raise ValueError("PIO programs do not fit into instruction memory")
+
+    placed = []
+    for (pio_idx, block_units) in enumerate(best["assignment"]):
+        block_entries = [e for u in block_units for e in u]
+        block_entries.sort(key=lambda e: (e[0], e[2]))
+        for (slot, entry) in enumerate(block_entries):
+            placed.append([entry[0], entry[1], entry[2],
+                          slot + pio_idx * sm_count])
+
+    return sorted(placed, key=lambda e: (e[0], e[2]))
+
+
+def pio_usage(entries, placed, sm_count=PIO_SM_COUNT, blocks=PIO_BLOCKS):
+    """
+    Returns `[[instructions, state_machines], ...]` per PIO block.
+    """
+    usage = [[0, 0] for _ in range(blocks)]
+    loaded = [{} for _ in range(blocks)]
+    keys = {(e[0], e[2]): _entry_key(e) for e in entries}
+    for entry in placed:
+        pio_idx = entry[3] // sm_count
+        key = keys[(entry[0], entry[2])]
+        usage[pio_idx][1] += 1
+        if key not in loaded[pio_idx]:
+            loaded[pio_idx][key] = True
+            usage[pio_idx][0] += entry[1]
+
+    return usage
+
+
+def usage_str(usage, memory=PIO_MEMORY, sm_count=PIO_SM_COUNT):
+    return " ".join(
+        f"PIO{idx}:{u[0]}/{memory} SM:{u[1]}/{sm_count}"
+        for (idx, u) in enumerate(usage))
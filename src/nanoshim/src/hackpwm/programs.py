@@ -93,11 +93,18 @@ class PIOWrapper:
             self.X = X
             self.Y = Y
 
+    # The value x()/y() would store, used by fields to clamp encoder steps
+    def clamp_x(self, x):
+        return min(self.MAX_VALUE, max(0, int(x) - self.X)) + self.X
+
+    def clamp_y(self, y):
+        return min(self.MAX_VALUE, max(0, int(y) - self.Y)) + self.Y
+
     def x(self, x=None):
         if self.X is None:
             raise KeyError("This program does not support `x` parameter")
         if x is not None:
-            self._x = min(self.MAX_VALUE, max(0, int(x) - self.X))
+            self._x = self.clamp_x(x) - self.X
             if (self._y == 0):
                 self.pause()
             elif (self.paused):
@@ -109,7 +116,7 @@ class PIOWrapper:
         if self.Y == None:
             raise KeyError("This program does not support `y` parameter")
         if y is not None:
-            self._y = min(self.MAX_VALUE, max(0, int(y) - self.Y))
+            self._y = self.clamp_y(y) - self.Y
             if (self._y == 0):
                 self.pause()
             elif (self.paused):
@@ -144,7 +151,14 @@ class PIOWrapper:
             self.sm.exec("in_(null, 32)")
 
     def remove(self):
-        PIO(pio_by_sid(self.sm_id)).remove_program(self.program)
+        remove_program(self.sm_id, self.program)
+
+    # All PIO programs of this wrapper, in the order of their state machines
+    def get_programs(self):
+        return [self.program]
+
+    def set_program(self, idx, program):
+        self.program = program
 
     # The base store structure
     def setup_store(self, store):
@@ -204,9 +218,9 @@ class BasePIOControl(PIOWrapper):
             fields.append(LabelField(self.label))
 
         fields.extend([
-            Field(self.label_x, get_value=self.x,
+            Field(self.label_x, get_value=self.x, clamp=self.clamp_x,
                   on_change=self.on_change_x, render_value=self.render_x),
-            Field(self.label_y, get_value=self.y,
+            Field(self.label_y, get_value=self.y, clamp=self.clamp_y,
                   on_change=self.on_change_y, render_value=self.render_y)
         ])
 
@@ -292,6 +306,7 @@ class PWM(BasePIOControl):
             Field(
                 self.label_duty,
                 get_value=self.y,
+                clamp=self.clamp_duty,
                 render_value=self.render_duty,
                 on_change=self.on_change_duty,
                 on_mode=self.switch_duty_mode,
@@ -316,6 +331,9 @@ class PWM(BasePIOControl):
         self.y(duty)
         self.on_change_x(value - duty)
 
+    def clamp_duty(self, value):
+        return self.clamp_y(min(value, self.get_period() - self.X))
+
     def on_change_duty(self, value):
         period = self.get_period()
         y = self.y(min(value, period - self.X))
@@ -445,17 +463,17 @@ class PHASE_PULSE(BasePIOControl):
         if (self.label):
             fields.append(LabelField(self.label))
 
-        fields.append(Field(self.label_phase, get_value=self.x, with_exp=True,
+        fields.append(Field(self.label_phase, get_value=self.x, with_exp=True, clamp=self.clamp_x,
                       on_change=self.on_change_x, render_value=ticks_to_time_str))
 
         if (is_int(self.count_pin)):
             duty_field = Field(
-                self.label_count, get_value=self.y,
+                self.label_count, get_value=self.y, clamp=self.clamp_y,
                 with_exp=True, on_change=self.on_change_y)
         else:
             duty_field = Field(
                 self.label_duty, get_value=self.y, render_value=ticks_to_time_str,
-                with_exp=True, on_change=self.on_change_y)
+                with_exp=True, clamp=self.clamp_y, on_change=self.on_change_y)
 
         fields.append(duty_field)
         return fields
@@ -538,9 +556,9 @@ class IRQ_TRIGGER(BasePIOControl):
             fields.append(LabelField(self.label))
 
         fields.extend([
-            Field(self.label_x, get_value=self.x,
+            Field(self.label_x, get_value=self.x, clamp=self.clamp_x,
                   on_change=self.on_change_x, render_value=ticks_to_time_str, with_exp=True),
-            Field(self.label_y, get_value=self.y,
+            Field(self.label_y, get_value=self.y, clamp=self.clamp_y,
                   on_change=self.on_change_y, render_value=ticks_to_time_str, with_exp=True)
         ])
 
@@ -598,8 +616,17 @@ class MIX(IRQ_TRIGGER):
             super().active(0)
 
     def remove(self):
-        PIO(pio_by_sid(self.sm_id[0])).remove_program(self.program)
-        PIO(pio_by_sid(self.sm_id[1])).remove_program(self.mix_program)
+        remove_program(self.sm_id[0], self.program)
+        remove_program(self.sm_id[1], self.mix_program)
+
+    def get_programs(self):
+        return [self.program, self.mix_program]
+
+    def set_program(self, idx, program):
+        if (idx == 0):
+            self.program = program
+        else:
+            self.mix_program = program
 
     def create_program(self):
         self.mix_program, mix_inst, _, _ = self.create_mix_program()
@@ -692,3 +719,14 @@ def create_six_pin_mix_program(inverted, mode):
 
 def pio_by_sid(sid):
     return 1 if sid > 3 else 0
+
+
+# Load offset of the program in PIO0, PIO1 follows (see rp2.py, -1 if not loaded)
+_PROG_OFFSET_PIO0 = const(1)
+
+
+def remove_program(sid, program):
+    pio = pio_by_sid(sid)
+    if program[_PROG_OFFSET_PIO0 + pio] < 0:
+        return # shared with another state machine, already removed
+    PIO(pio).remove_program(program)
@@ -1,26 +1,10 @@
 # pwm_system.py
 from lib.ui_program import UIListProgram
 from lib.store import Stores, ChildStore
-from hackpwm.programs import ALL_PROGRAMS
+from hackpwm.programs import ALL_PROGRAMS, pio_by_sid
+from hackpwm.pio_packer import pack_pio, pio_usage, program_key
 from misc.rgbled import Led
 
-def first_fit_pio(instructions_per_sm):
-    free_instructions = [32, 32]
-    sorted_sm = sorted(instructions_per_sm, key=lambda sm: sm[1], reverse=True)
-    for (pio_idx, free) in enumerate(free_instructions):
-        free_slots = 4
-        for next_large in sorted_sm:
-            if (free >= next_large[1] and len(next_large) == 3):
-                sm_id = abs(free_slots - 4) + (pio_idx * 4)
-                next_large.append(sm_id)
-                free = free - next_large[1]
-                free_slots = free_slots - 1
-
-            if (free == 0 or free_slots == 0):
-                break
-
-    return sorted(sorted_sm, key=lambda sm: sm[0])
-
 def group_list(list_to_group):
     last_pidx = list_to_group[-1][0]
     new_list = []
@@ -76,10 +60,9 @@ class PWMSystem(UIListProgram):
                 check_key="pid"
             )
             programs_store.append(program_store)
-            if isinstance(program.instructions, list):
-                for iidx, i in enumerate(program.instructions): instructions.append([idx, i, iidx])
-            else:
-                instructions.append([idx, program.instructions, 0])
+            for iidx, pio_program in enumerate(program.get_programs()):
+                instructions.append(
+                    [idx, len(pio_program[0]), iidx, program_key(pio_program)])
             version += int(program_store.initial_data.get("version", 0))
             self.programs.append(program)
 
@@ -88,7 +71,10 @@ class PWMSystem(UIListProgram):
             "programs": [p.initial_data for p in programs_store]
         })
 
-        programs_sm = group_list(first_fit_pio(instructions))
+        placed = pack_pio(instructions)
+        self.pio_usage = pio_usage(instructions, placed)
+        self.share_programs(placed)
+        programs_sm = group_list(placed)
 
         # setup machines
         for idx, program in enumerate(self.programs):
@@ -96,6 +82,18 @@ class PWMSystem(UIListProgram):
             program.store.set_parent(self.store)
             program.setup_machine(programs_sm[idx])
 
+    # Identical programs inside one PIO are loaded once and run on several machines
+    def share_programs(self, placed):
+        loaded = {}
+        for (pidx, _, iidx, sm_id) in placed:
+            program = self.programs[pidx]
+            pio_program = program.get_programs()[iidx]
+            key = (pio_by_sid(sm_id), program_key(pio_program))
+            if key in loaded:
+                program.set_program(iidx, loaded[key])
+            else:
+                loaded[key] = pio_program
+
     def handle_button(self):
         if self.running: return
 
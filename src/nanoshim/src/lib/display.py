@@ -1,5 +1,4 @@
 from machine import Pin, I2C
-import framebuf
 import misc.images as images
 import lib.ssd1306 as ssd1306
 from lib.store import Stores
@@ -16,6 +15,19 @@ STORE_STRUCTURE = {
 }
 store = Stores.get_store(path="/store/display.json", initial_data=STORE_STRUCTURE)
 
+WIDTH = 128
+PAGES = 8
+ROW_HEIGHT = 12
+VISIBLE_ROWS = 4
+
+
+def pages_mask(y0, y1):
+    # bitmask of the 8 pixel pages covered by the rows y0..y1 (exclusive)
+    mask = 0
+    for page in range(max(0, y0) // 8, min(PAGES * 8, y1 + 7) // 8):
+        mask |= 1 << page
+    return mask
+
 
 class Display:
     def __init__(self):
@@ -27,83 +39,130 @@ class Display:
         self.display.rotate(0)
         self.display.invert(0)
         self.display.contrast(store.get(CONTRAST_PATH))
+        # title + the visible menu rows, as they are currently on the display
+        self.rows = [None] * (VISIBLE_ROWS + 1)
 
     def render_menu(self, title, items, active_idx=0, exp=None):
-        menubuf = framebuf.FrameBuffer(
-            bytearray(1024), 128, 64, framebuf.MONO_HLSB)
+        # Render straight into the persistent display buffer. Every row keeps
+        # the state it was rendered with, only changed rows are cleared and
+        # drawn again, and only the pages they touch are sent to the display.
+        buf = self.display
+        rows = self.rows
+        dirty = 0
+
+        if (rows[0] != title):
+            rows[0] = title
+            buf.fill_rect(0, 0, WIDTH, ROW_HEIGHT, 0)
+            buf.text(title, 0, 0, 1)
+            buf.hline(0, 12, WIDTH, 1)
+            dirty |= pages_mask(0, 13)
 
-        menubuf.text(title, 0, 0, 1)
-        menubuf.hline(0, 12, 128, 1)
         start = max(0, active_idx - 2)
-        items = items[start:]
+        items = items[start:start + VISIBLE_ROWS]
 
-        for idx, item in enumerate(items, start=0):
+        for idx in range(VISIBLE_ROWS):
             text_y_pos = 8 + 12 * (idx + 1)
-            is_active = idx + start == active_idx
+            row_state = None
 
-            if type(item) is not list:
-                item = [item, lambda: ""]
+            if (idx < len(items)):
+                is_active = idx + start == active_idx
+                item = items[idx]
 
-            [left, right] = item
-            text_addition = str(right())
+                if type(item) is not list:
+                    item = [item, lambda: ""]
 
-            left_text = ""
-            if (type(left) is list):
-                for item in left:
-                    if (callable(item)):
-                        item = item()
+                [left, right] = item
+                text_addition = str(right())
 
-                    left_text += str(item)
-            else:
-                left_text = left
+                left_text = ""
+                if (type(left) is list):
+                    for item in left:
+                        if (callable(item)):
+                            item = item()
 
-            # Fill a white rect around the item, when its active
-            if is_active:
-                menubuf.fill_rect(0, text_y_pos - 3, 128, 12, 1)
+                        left_text += str(item)
+                else:
+                    left_text = left
 
-            # Put the static text, which is mostly the label
-            menubuf.text(left_text, 0, text_y_pos, int(not is_active))
+                row_state = (left_text, text_addition, is_active,
+                             exp if is_active else None)
 
-            # add text addition, align to right.
-            # we have max 128pixel calculate the text_addition pixel len
-            # and substract the result from 128, we should get the position of the text.
-            text_addition_len = len(text_addition)
-            if (text_addition_len == 0):
+            if (rows[idx + 1] == row_state):
                 continue
 
-            menubuf.text(text_addition, 128 - text_addition_len *
-                         8, text_y_pos, int(not is_active))
-
-            # we start from end of the text_addtion string
-            # Ok, this code is a bit tricky, but it does the job.
-            # Because we have to display numbers as text, they don't look very pretty.
-            # Like 12787800, it difficult to read, so we should add some decimal separator after each 3 digits.
-            # We also have the ability to change the number by a factor of 10 with each encoder turn,
-            # So the exp is passed along into this function, and if this item is currently selected,
-            # we can show the user which factor he/she is currently using.
-            # Lets go!
-
-            it = 0
-            digits_count = 0
-            while (it <= text_addition_len):
-                it += 1
-                if (text_addition[text_addition_len - it].isdigit()):
-                    digits_count += 1
-                    if (digits_count > 1 and (digits_count - 1) % 3 == 0):
-                        menubuf.hline(128 - (it - 1) * 8 - 1,
-                                      text_y_pos + 7, 2, int(not is_active))
-
-                    if (is_active and exp is not None and digits_count == exp + 1):
-                        menubuf.hline(128 - (it) * 8 + 2,
-                                      text_y_pos - 2, 4, int(not is_active))
-
-                elif (digits_count > 0):
-                    break
-
-        self.display.blit(menubuf, 0, 0)
-        self.display.show()
+            rows[idx + 1] = row_state
+            buf.fill_rect(0, text_y_pos - 3, WIDTH, ROW_HEIGHT, 0)
+            dirty |= pages_mask(text_y_pos - 3, text_y_pos + 9)
+            if (row_state is not None):
+                self.render_row(text_y_pos, *row_state)
+
+        self.show_pages(dirty)
+
+    def render_row(self, text_y_pos, left_text, text_addition, is_active, exp):
+        buf = self.display
+
+        # Fill a white rect around the item, when its active
+        if is_active:
+            buf.fill_rect(0, text_y_pos - 3, WIDTH, ROW_HEIGHT, 1)
+
+        # Put the static text, which is mostly the label
+        buf.text(left_text, 0, text_y_pos, int(not is_active))
+
+        # add text addition, align to right.
+        # we have max 128pixel calculate the text_addition pixel len
+        # and substract the result from 128, we should get the position of the text.
+        text_addition_len = len(text_addition)
+        if (text_addition_len == 0):
+            return
+
+        buf.text(text_addition, WIDTH - text_addition_len *
+                 8, text_y_pos, int(not is_active))
+
+        # we start from end of the text_addtion string
+        # Ok, this code is a bit tricky, but it does the job.
+        # Because we have to display numbers as text, they don't look very pretty.
+        # Like 12787800, it difficult to read, so we should add some decimal separator after each 3 digits.
+        # We also have the ability to change the number by a factor of 10 with each encoder turn,
+        # So the exp is passed along into this function, and if this item is currently selected,
+        # we can show the user which factor he/she is currently using.
+        # Lets go!
+
+        it = 0
+        digits_count = 0
+        while (it <= text_addition_len):
+            it += 1
+            if (text_addition[text_addition_len - it].isdigit()):
+                digits_count += 1
+                if (digits_count > 1 and (digits_count - 1) % 3 == 0):
+                    buf.hline(WIDTH - (it - 1) * 8 - 1,
+                              text_y_pos + 7, 2, int(not is_active))
+
+                if (is_active and exp is not None and digits_count == exp + 1):
+                    buf.hline(WIDTH - (it) * 8 + 2,
+                              text_y_pos - 2, 4, int(not is_active))
+
+            elif (digits_count > 0):
+                break
+
+    def show_pages(self, dirty):
+        # send every run of consecutive dirty pages as one window
+        page = 0
+        while (page < PAGES):
+            if (dirty & (1 << page)):
+                end = page
+                while (end + 1 < PAGES and dirty & (1 << (end + 1))):
+                    end += 1
+                self.display.show(page, end)
+                page = end
+            page += 1
+
+    def invalidate(self):
+        self.display.fill(0)
+        for idx in range(len(self.rows)):
+            self.rows[idx] = None
 
     def render_image(self, image=images.EYES):
+        self.invalidate()
         self.display.blit(image, 0, 0)
         self.display.show()
 
@@ -56,8 +56,9 @@ class Field(WithExp):
     exp_key = "_"
     is_freq = False
 
-    def __init__(self, label, get_value, on_change, on_mode=noop_1, render_value=default_render, with_exp=False, is_freq=False):
+    def __init__(self, label, get_value, on_change, on_mode=noop_1, render_value=default_render, with_exp=False, is_freq=False, clamp=None):
         self.label = label
+        self.clamp = clamp
         self.on_mode = on_mode
         self.with_exp = with_exp
         self.get_value = get_value
@@ -75,6 +76,7 @@ class Field(WithExp):
             "text": text,
             "handle_plusminus": self.handle_plusminus,
             "handle_encoder": self.handle_change,
+            "handle_delta": self.handle_delta,
         }
 
     def _render_value(self):
@@ -88,6 +90,22 @@ class Field(WithExp):
         inc = self.dir_to_inc(e)
         self.on_change(self.get_value_by_exp(value, inc))
 
+    # Applies several encoder steps with a single on_change. The value is
+    # clamped after every step, as on_change would do; without a clamp only
+    # on_change knows the limits and the steps are applied one by one
+    def handle_delta(self, delta):
+        event = UIListProgram.INC if delta > 0 else UIListProgram.DEC
+        if (self.clamp is None):
+            for _ in range(abs(delta)):
+                self.handle_change(event)
+            return
+
+        value = self.get_value()
+        inc = self.dir_to_inc(event)
+        for _ in range(abs(delta)):
+            value = self.clamp(self.get_value_by_exp(value, inc))
+        self.on_change(value)
+
     def handle_plusminus(self, e):
         if (self.with_exp):
             self.update_exp(e)
@@ -1,22 +1,44 @@
 import uasyncio as asyncio
-from machine import ADC
+from machine import ADC, Timer
+from array import array
 import time
-import gc
+
+# Event kinds, packed with the level index into one value of the event ring
+_SHORT = 1
+_LONG = 2
+_EVENTS = 8
 
 
 class Levels:
-    _last_level = None
-    debounce_ms = 30
+    sample_ms = 2
+    filter_size = 5
     none_level = 65000
     callbacks = {}
     long_callbacks = {}
     long_press = 1000
+    min_press = 10
 
     def __init__(self, pin, levels, cb):
         self.cb = cb
         self.levels = sorted(levels)
         self.adc = ADC(pin)
+        self.lut = self.create_lut()
+
+        # Everything the timer callback touches is allocated once here
+        self._samples = array("H", [65535] * self.filter_size)
+        self._sorted = array("H", self._samples)
+        self._sample_idx = 0
+        self._state = 0
+        self._press_start = 0
+        self._long_sent = False
+        self._events = array("B", [0] * _EVENTS)
+        self._ev_head = 0
+        self._ev_tail = 0
+
+        self._tsf = asyncio.ThreadSafeFlag()
         self._run = asyncio.create_task(self.watch())
+        self._timer = Timer(period=self.sample_ms,
+                            mode=Timer.PERIODIC, callback=self.sample)
 
     def on(self, level, cb):
         self.callbacks[level] = cb
@@ -24,49 +46,76 @@ class Levels:
     def on_long(self, level, cb):
         self.long_callbacks[level] = cb
 
-    async def watch(self):
-        while True:
-            for level in self.levels:
-                if self.is_level(self.adc.read_u16(), level):
-                    start = time.ticks_ms()
-                    long_press = False
-                    press_duration = 0
-
-                    # wait hold
-                    while (True):
-                        is_level = self.is_level(
-                            self.adc.read_u16(), level)
-
-                        if (not is_level):
-                            break
-
-                        press_duration = time.ticks_ms() - start
-                        if (press_duration > 1000):
-                            long_press = True
-                            break
-
-                        await asyncio.sleep_ms(1)
-
-                    if (long_press):
-                        asyncio.create_task(self._long_cb(level))
-                    elif (press_duration > 10):
-                        asyncio.create_task(self._cb(level))
-
-                    await self.wait_release(level)
-                    gc.collect()
+    def create_lut(self):
+        # Maps the upper 8 bits of a reading to level index + 1, 0 is no level.
+        # First matching level wins, same as the linear scan did.
+        lut = bytearray(256)
+        for bucket in range(256):
+            state = (bucket << 8) + 128
+            for idx, level in enumerate(self.levels):
+                if self.is_level(state, level):
+                    lut[bucket] = idx + 1
                     break
+        return lut
+
+    def median(self):
+        # insertion sort into the preallocated copy, no allocations
+        buf = self._sorted
+        n = self.filter_size
+        for i in range(n):
+            value = self._samples[i]
+            j = i - 1
+            while j >= 0 and buf[j] > value:
+                buf[j + 1] = buf[j]
+                j -= 1
+            buf[j + 1] = value
+        return buf[n >> 1]
+
+    def push_event(self, kind, state):
+        nxt = (self._ev_head + 1) % _EVENTS
+        if nxt == self._ev_tail:
+            return  # consumer is behind, drop
+        self._events[self._ev_head] = kind << 4 | state
+        self._ev_head = nxt
+        self._tsf.set()
+
+    def sample(self, _timer):
+        self._samples[self._sample_idx] = self.adc.read_u16()
+        self._sample_idx = (self._sample_idx + 1) % self.filter_size
+
+        state = self.lut[self.median() >> 8]
+        now = time.ticks_ms()
+        held = time.ticks_diff(now, self._press_start)
+
+        if state == self._state:
+            if state and not self._long_sent and held > self.long_press:
+                self._long_sent = True
+                self.push_event(_LONG, state)
+            return
+
+        # released or changed to another level
+        if self._state and not self._long_sent and held > self.min_press:
+            self.push_event(_SHORT, self._state)
+
+        self._state = state
+        self._press_start = now
+        self._long_sent = False
 
-            await asyncio.sleep_ms(self.debounce_ms)
-
-    async def wait_release(self, level):
-        while (True):
-            adc_level = self.adc.read_u16()
-            is_level = self.is_level(adc_level, level)
-            if (not is_level):
-                break
-            await asyncio.sleep_ms(1)
-
-        return True
+    async def watch(self):
+        while True:
+            await self._tsf.wait()
+            while self._ev_tail != self._ev_head:
+                event = self._events[self._ev_tail]
+                self._ev_tail = (self._ev_tail + 1) % _EVENTS
+                level = self.levels[(event & 0xF) - 1]
+                if (event >> 4 == _LONG):
+                    asyncio.create_task(self._long_cb(level))
+                else:
+                    asyncio.create_task(self._cb(level))
+
+    def deinit(self):
+        self._timer.deinit()
+        self._run.cancel()
 
     async def _long_cb(self, level):
         if (level in self.long_callbacks and callable(self.long_callbacks[level])):
@@ -1,4 +1,4 @@
-from machine import Pin
+from machine import Pin, disable_irq, enable_irq
 import time
 import uasyncio as asyncio
 
@@ -16,6 +16,9 @@ TAP = 4
 class Rotary:
     event = None
     transition = 0
+    # steps counted by the irq since the last run, + is INC, - is DEC
+    delta = 0
+    tapped = False
     _press_time = float('inf')
 
     def __init__(self, clk, sw, dt, handler=noop):
@@ -48,10 +51,10 @@ class Rotary:
         self.transition = 0b11111111 & self.transition << 4 | self.last_status << 2 | new_status
 
         if self.transition in [23, 232]:
-            self.event = INC
+            self.delta += 1
             self._tsf.set()
         elif self.transition in [43, 212]:
-            self.event = DEC
+            self.delta -= 1
             self._tsf.set()
 
         self.last_status = new_status
@@ -70,10 +73,25 @@ class Rotary:
 
         elif (pin_value == 1 and (now - self._press_time) > 300):
             self._press_time = float("inf")
-            self.event = TAP
+            self.tapped = True
             self._tsf.set()
 
     async def _run(self):
+        # One wakeup may carry several steps, none of them get lost
         while True:
             await self._tsf.wait()
-            self.handler(self.event)
+            state = disable_irq()
+            delta = self.delta
+            tapped = self.tapped
+            self.delta = 0
+            self.tapped = False
+            enable_irq(state)
+
+            if (delta != 0):
+                self.event = INC if delta > 0 else DEC
+                for _ in range(abs(delta)):
+                    self.handler(self.event)
+
+            if (tapped):
+                self.event = TAP
+                self.handler(TAP)
@@ -91,7 +91,10 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(SET_COM_OUT_DIR | ((rotate & 1) << 3))
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
 
-    def show(self):
+    def show(self, page0=0, page1=None):
+        # page0..page1 limit the transfer to a window of 8 pixel pages
+        if page1 is None:
+            page1 = self.pages - 1
         x0 = 0
         x1 = self.width - 1
         if self.width != 128:
@@ -103,9 +106,12 @@ class SSD1306(framebuf.FrameBuffer):
         self.write_cmd(x0)
         self.write_cmd(x1)
         self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        self.write_cmd(page0)
+        self.write_cmd(page1)
+        if page0 == 0 and page1 == self.pages - 1:
+            self.write_data(self.buffer)
+        else:
+            self.write_data(memoryview(self.buffer)[page0 * self.width:(page1 + 1) * self.width])
 
 
 class SSD1306_I2C(SSD1306):
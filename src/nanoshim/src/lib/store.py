@@ -2,17 +2,39 @@ import os
 import json
 import uasyncio as asyncio
 
+# Compiled dotted paths, "programs.0.x" -> ("programs", 0, "x")
+_compiled_paths = {}
+
+
+def compile_path(path):
+    keys = _compiled_paths.get(path)
+    if keys is None:
+        keys = tuple(int(part) if part.isdigit() else part
+                     for part in path.split("."))
+        _compiled_paths[path] = keys
+
+    return keys
+
+
 class Store:
     is_loading = False
     is_saving_scheduled = False
     has_updates = False
     data = None
+    # The saver compacts the journal into the json file once it grows over
+    # this size and the store is idle, save() forces it at 4 times the size
+    journal_limit = 4096
 
     def __init__(self, path, inital_data):
         self.path = path
+        self.journal_path = path + ".log"
+        self.tmp_path = path + ".tmp"
         self.inital_data = inital_data
         self.dir = "/".join(path.split("/")[0:-1])
         self.file_name = path.split("/")[-1]
+        self.journal_size = 0
+        self._pending = {}
+        self._pending_paths = []
 
         self.ensure_file()
         self.load()
@@ -30,8 +52,13 @@ class Store:
 
         os.chdir("/")
 
-        if (self.file_name not in os.listdir(self.dir)):
-            self.save(self.inital_data)  # Initialy it will save
+        files = os.listdir(self.dir)
+        if (self.file_name not in files):
+            # A compaction might have been interrupted before the rename
+            if (self.file_name + ".tmp" in files):
+                self._replace(self.tmp_path, self.path)
+            else:
+                self.save(self.inital_data)  # Initialy it will save
 
     def ensure_version(self):
         if (self.data.get("version", None) != self.inital_data.get("version", None)):
@@ -39,20 +66,17 @@ class Store:
             self.load()
 
     def set(self, path, value):
-        path_parts = path.split(".")
+        keys = compile_path(path)
         obj = self.data
 
-        for part in path_parts[:-1]:
-            if part.isdigit():
-                obj = obj[int(part)]
-            else:
-                obj = obj[part]
+        for key in keys[:-1]:
+            obj = obj[key]
 
-        if path_parts[-1].isdigit():
-            obj[int(path_parts[-1])] = value
-        else:
-            obj[path_parts[-1]] = value
+        obj[keys[-1]] = value
 
+        if (path not in self._pending):
+            self._pending[path] = True
+            self._pending_paths.append(path)
         self.has_updates = True
 
     def get(self, path, data=None):
@@ -62,13 +86,8 @@ class Store:
             else:
                 obj = self.data
 
-            path_parts = path.split(".")
-
-            for part in path_parts:
-                if part.isdigit():
-                    obj = obj[int(part)]
-                else:
-                    obj = obj[part]
+            for key in compile_path(path):
+                obj = obj[key]
             return obj
         except:
             print(path, "Error", self.data)
@@ -80,19 +99,102 @@ class Store:
             self.data = json.loads(f.read())
             f.close()
 
+        self.replay_journal()
         self.is_loading = False
 
+    def replay_journal(self):
+        self.journal_size = 0
+        try:
+            f = open(self.journal_path)
+        except OSError:
+            return
+
+        torn = False
+        with f:
+            for line in f:
+                self.journal_size += len(line)
+                try:
+                    if not line.endswith("\n"):
+                        raise ValueError()
+                    [path, value] = json.loads(line)
+
+                    keys = compile_path(path)
+                    obj = self.data
+                    for key in keys[:-1]:
+                        obj = obj[key]
+                    obj[keys[-1]] = value
+                except ValueError:
+                    torn = True  # torn write of the last record
+                    break
+                except (KeyError, IndexError, TypeError):
+                    torn = True  # the record does not fit the data, a stale journal
+                    break
+
+        # Appending after a torn record would glue the next one to it
+        if torn:
+            self.compact()
+
+    """
+    Appends the changed paths to the journal, the whole file is only
+    rewritten by compact() or when data is given explicitly.
+    """
+
     def save(self, data=None):
+        if data is not None or self.journal_size >= self.journal_limit * 4:
+            return self.compact(data)
+
+        paths = self._pending_paths
+        self._pending = {}
+        self._pending_paths = []
+        try:
+            with open(self.journal_path, "a") as f:
+                for path in paths:
+                    try:
+                        value = self.get(path)
+                    except KeyError:
+                        continue  # the path was removed since set()
+                    line = json.dumps([path, value]) + "\n"
+                    f.write(line)
+                    self.journal_size += len(line)
+                f.close()
+            self.has_updates = False
+        except OSError as exc:
+            print("Error saving to file.", self.journal_path, exc)
+
+    def compact(self, data=None):
         if data == None:
             data = self.data
         try:
-            with open(str(self.path), "w") as f:
+            # Write aside and rename, the old file stays valid until then
+            with open(self.tmp_path, "w") as f:
                 f.write(json.dumps(data))
                 f.close()
-                self.has_updates = False
+            if data is not self.data:
+                # The journal belongs to the old data, it must not be
+                # replayed onto the new file if we stop right after the rename
+                self._remove_journal()
+            self._replace(self.tmp_path, self.path)
+            self._remove_journal()
+            self.journal_size = 0
+            self._pending = {}
+            self._pending_paths = []
+            self.has_updates = False
         except OSError as exc:
             print("Error saving to file.", self.path, exc)
 
+    def _remove_journal(self):
+        try:
+            os.remove(self.journal_path)
+        except OSError:
+            pass
+
+    def _replace(self, src, dst):
+        try:
+            os.rename(src, dst)
+        except OSError:
+            os.remove(dst)
+            os.rename(src, dst)
+
 
 class ChildStore():
     parent_store: Store
@@ -129,8 +231,11 @@ class StoreRegistry():
     async def _saver(self):
         while True:
             for p in self._store_paths:
-                if (self._stores[p].has_updates):
-                    self._stores[p].save()
+                store = self._stores[p]
+                if (store.has_updates):
+                    store.save()
+                elif (store.journal_size >= store.journal_limit):
+                    store.compact()
 
             await asyncio.sleep(1)
     def _add_store(self, path, store):
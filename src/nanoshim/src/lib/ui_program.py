@@ -1,3 +1,4 @@
+import uasyncio as asyncio
 from lib.user_inputs import (
     SW1, SW2, SW3, SW4, SW5,
     INC, DEC, TAP,
@@ -7,6 +8,45 @@ from lib.user_inputs import (
 from lib.display import display
 
 
+class RenderScheduler:
+    """
+    Renders the active program at most once per frame.
+    Events only mark the program dirty, the scheduler task does the work.
+    """
+    program = None
+    _task = None
+
+    def __init__(self, fps=25):
+        self.set_fps(fps)
+        self._event = asyncio.Event()
+
+    def set_fps(self, fps):
+        self.frame_ms = int(1000 / max(1, fps))
+
+    def schedule(self, program):
+        current = self.program
+        if (current is not None and current is not program):
+            # Encoder steps turned before the switch belong to the old program
+            current.flush_input()
+
+        self.program = program
+        if (self._task is None):
+            self._task = asyncio.create_task(self._run())
+        self._event.set()
+
+    async def _run(self):
+        while True:
+            await self._event.wait()
+            self._event.clear()
+            if (self.program is not None):
+                self.program.flush()
+
+            await asyncio.sleep_ms(self.frame_ms)
+
+
+scheduler = RenderScheduler()
+
+
 class UIListProgram:
     autostartable = False
     title = ""
@@ -14,6 +54,9 @@ class UIListProgram:
     selected_item = 0
     items = []
     set_exit = None
+    scheduler = scheduler
+    _dirty = False
+    _delta = 0
 
     MINUS = 1
     PLUS = 2
@@ -61,7 +104,25 @@ class UIListProgram:
 
     def on_long_press(self): pass
 
+    # Mark the screen as outdated, the scheduler renders it with the next frame
     def render(self):
+        self._dirty = True
+        self.scheduler.schedule(self)
+
+    def flush_input(self):
+        delta = self._delta
+        self._delta = 0
+        if (delta != 0):
+            self.handle_delta(delta)
+
+    def flush(self):
+        self.flush_input()
+
+        if (self._dirty):
+            self._dirty = False
+            self.render_now()
+
+    def render_now(self):
         self.display.render_menu(
             self.title,
             self.get_items_text(),
@@ -89,11 +150,27 @@ class UIListProgram:
     def on_sw5(self):
         self.handle_plusminus(UIListProgram.PLUS)
 
+    # Encoder steps are summed up and applied once per frame
     def encoder_handler(self, event):
         if (event == INC):
-            self.handle_encoder(UIListProgram.INC)
+            self._delta += 1
         elif (event == DEC):
-            self.handle_encoder(UIListProgram.DEC)
+            self._delta -= 1
+        else:
+            return
+
+        self.scheduler.schedule(self)
+
+    def handle_delta(self, delta):
+        item = self.get_items()[self.selected_item]
+        if ("handle_delta" in item):
+            item["handle_delta"](delta)
+            self.render()
+            return
+
+        event = UIListProgram.INC if delta > 0 else UIListProgram.DEC
+        for _ in range(abs(delta)):
+            self.handle_encoder(event)
 
     def handle_encoder(self, event):
         items = self.get_items()
@@ -1,21 +1,9 @@
+import os
+import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
 
-def first_fit_pio(instructions_per_sm):
-    free_instructions = [32, 32]
-    sorted_sm = sorted(instructions_per_sm, key=lambda sm: sm[1], reverse=True)
-    for (pio_idx, free) in enumerate(free_instructions):
-        free_slots = 4
-        for next_large in sorted_sm:
-            if (free >= next_large[1] and len(next_large) == 3):
-                sm_id = abs(free_slots - 4) + (pio_idx * 4)
-                next_large.append(sm_id)
-                free = free - next_large[1]
-                free_slots = free_slots - 1
-
-            if (free == 0 or free_slots == 0):
-                break
-
-    return sorted(sorted_sm, key=lambda sm: sm[0])
+from hackpwm.pio_packer import pack_pio, pio_usage
 
 def group_list(list_to_group):
     last_pidx = list_to_group[-1][0]
@@ -38,7 +26,7 @@ def test_first_fit_normal():
     assert [
         [0, 10, 0, 0],
         [1, 10, 0, 1],
-    ] == first_fit_pio(data)
+    ] == pack_pio(data)
 
 def test_first_fit_normal_double():
     data = [
@@ -51,7 +39,7 @@ def test_first_fit_normal_double():
         [0, 10, 0, 0],
         [0, 10, 1, 1],
         [1, 10, 0, 2],
-    ] == first_fit_pio(data)
+    ] == pack_pio(data)
 
 
 def test_group():
@@ -66,3 +54,60 @@ def test_group():
              2,
         ]
         assert expected == group_list(data)
+
+
+def test_pack_shares_identical_programs():
+    # 6 identical PWM programs do not fit without sharing
+    data = [[i, 6, 0, "pwm"] for i in range(6)]
+
+    placed = pack_pio(data)
+    assert [p[3] for p in placed] == [0, 1, 2, 3, 4, 5]
+    assert [[6, 4], [6, 2]] == pio_usage(data, placed)
+
+
+def test_pack_exact_fit():
+    # greedy largest first puts 14 + 12 into the first block and fails
+    data = [
+        [0, 14, 0],
+        [1, 12, 0],
+        [2, 10, 0],
+        [3, 10, 0],
+        [4, 9, 0],
+        [5, 9, 0],
+    ]
+
+    placed = pack_pio(data)
+    usage = pio_usage(data, placed)
+    assert [32, 32] == [u[0] for u in usage]
+
+
+def test_pack_keeps_program_parts_together():
+    data = [
+        [0, 20, 0],
+        [0, 10, 1],
+        [1, 20, 0],
+    ]
+
+    placed = pack_pio(data)
+    assert placed[0][3] // 4 == placed[1][3] // 4
+    assert placed[0][3] // 4 != placed[2][3] // 4
+
+
+def test_pack_too_large():
+    data = [[i, 12, 0] for i in range(6)]
+
+    try:
+        pack_pio(data)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_group_packed():
+    data = [
+        [0, 10, 0, "pwm"],
+        [1, 7, 0, "copy"],
+        [1, 10, 1, "pwm"],
+    ]
+
+    assert [0, [1, 2]] == group_list(pack_pio(data))
@@ -1,7 +1,8 @@
 import network
-import socket
 import time
+import uasyncio as asyncio
 from machine import Pin
+from tcp_link import TcpServer
 
 HOST = '192.168.0.123'
 PORT = 5421
@@ -20,29 +21,24 @@ def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
         else: raise Exception("WiFi connect failed")
     return sta.ifconfig()[0]
 
-def run_slave():
-    addr = socket.getaddrinfo('0.0.0.0', PORT)[0][-1]
-    s = socket.socket(); s.bind(addr); s.listen(1)
-    print('Slave listening on', addr)
-    while True:
-        cl, addr = s.accept()
-        print('Master connected from', addr)
-        try:
-            while True:
-                data = cl.recv(1024)
-                if not data: break
-                cmd = data.decode().strip()
-                print('Received command:', cmd)
-                if cmd == "ON":
-                    led.value(1); cl.send(b"OK: LED ON")
-                elif cmd == "OFF":
-                    led.value(0); cl.send(b"OK: LED OFF")
-                else: cl.send(b"ERROR: Unknown command")
-        except Exception as e: print("Error:", e)
-        finally: cl.close()
+# Команды: 1 байт кода, ответ - 1 байт статуса
+CMD_OFF = 0; CMD_ON = 1
+OK = 0; UNKNOWN = 1
+
+def handle(payload):
+    cmd = payload[0] if payload else None
+    if cmd == CMD_ON: led.value(1)
+    elif cmd == CMD_OFF: led.value(0)
+    else: return bytes((UNKNOWN,))
+    return bytes((OK,))
+
+async def run_slave():
+    server = TcpServer(PORT, handle)
+    await server.start()
+    while True: await asyncio.sleep(3600)
 
 sta = network.WLAN(network.STA_IF)
 if not sta.isconnected(): connect_wifi("TP-Link_0D14", "24827089")
 net = sta.ifconfig()[0]
-run_slave()
+asyncio.run(run_slave())
 
@@ -0,0 +1,238 @@
+# tcp_link.py
+# Постоянное TCP-соединение между платами на asyncio: кадры с префиксом
+# длины, несколько запросов одновременно (по request id), keepalive и
+# переподключение с нарастающей паузой.
+#
+# Кадр: <HBH длина payload, тип, id запроса; далее payload
+import uasyncio as asyncio
+import struct
+import time
+
+HEADER = struct.Struct('<HBH')
+MAX_PAYLOAD = 0xFFFF
+
+REQUEST = 1
+RESPONSE = 2
+PUSH = 3            # без ответа
+PING = 4
+PONG = 5
+
+
+class LinkClosed(Exception):
+    pass
+
+
+class TcpLink:
+    """
+    Одно соединение. handler(payload) -> bytes ответа (или корутина)
+    обслуживает входящие запросы, on_push(payload) - входящие PUSH.
+    """
+    keepalive_ms = 2000     # PING, если столько не было трафика
+    dead_ms = 6000          # соединение считается мёртвым
+
+    def __init__(self, reader, writer, handler=None, on_push=None):
+        self.reader = reader
+        self.writer = writer
+        self.handler = handler
+        self.on_push = on_push
+        self._next_id = 0
+        self._pending = {}          # id -> [Event, payload | LinkClosed]
+        self._header = bytearray(HEADER.size)
+        self._last_rx = time.ticks_ms()
+        self._task = None           # задача run()
+        self._lock = asyncio.Lock() # см. _send()
+        self.closed = False
+
+    def _write(self, kind, req_id, payload=b''):
+        if self.closed: raise LinkClosed()
+        n = len(payload)
+        if n > MAX_PAYLOAD: raise ValueError("TCP frame payload > 65535 bytes")
+        HEADER.pack_into(self._header, 0, n, kind, req_id)
+        self.writer.write(self._header)
+        if n: self.writer.write(payload)
+
+    async def _send(self, kind, req_id, payload=b''):
+        # запись и drain под одной блокировкой: uasyncio допускает
+        # только одного ожидающего записи на поток
+        async with self._lock:
+            self._write(kind, req_id, payload)
+            await self.writer.drain()
+
+    async def request(self, payload, timeout_ms=1000):
+        """Ответ на payload; запросов в полёте может быть сколько угодно"""
+        self._next_id = (self._next_id + 1) & 0xFFFF
+        req_id = self._next_id
+        slot = [asyncio.Event(), None]
+        self._pending[req_id] = slot
+        try:
+            await self._send(REQUEST, req_id, payload)
+            await asyncio.wait_for_ms(slot[0].wait(), timeout_ms)
+        finally:
+            self._pending.pop(req_id, None)
+        if isinstance(slot[1], LinkClosed): raise slot[1]
+        return slot[1]
+
+    async def push(self, payload):
+        await self._send(PUSH, 0, payload)
+
+    async def _respond(self, req_id, result):
+        try:
+            payload = await result
+            await self._send(RESPONSE, req_id, payload or b'')
+        except Exception as e:
+            print("TCP handler error:", e)
+
+    async def _on_request(self, req_id, payload):
+        result = self.handler(payload) if self.handler else b''
+        if hasattr(result, 'send'):     # корутина - ответим, когда будет готово
+            asyncio.create_task(self._respond(req_id, result))
+        else:
+            await self._send(RESPONSE, req_id, result or b'')
+
+    async def _keepalive(self):
+        try:
+            while not self.closed:
+                await asyncio.sleep_ms(self.keepalive_ms)
+                idle = time.ticks_diff(time.ticks_ms(), self._last_rx)
+                if idle > self.dead_ms:
+                    break
+                if idle >= self.keepalive_ms:
+                    await self._send(PING, 0)
+        except (OSError, LinkClosed):
+            pass
+        self.close()
+
+    async def run(self):
+        """Читает кадры до разрыва; возвращается после close()"""
+        self._task = asyncio.current_task()
+        ka = asyncio.create_task(self._keepalive())
+        try:
+            while not self.closed:
+                n, kind, req_id = HEADER.unpack(await self.reader.readexactly(HEADER.size))
+                payload = await self.reader.readexactly(n) if n else b''
+                self._last_rx = time.ticks_ms()
+                if kind == RESPONSE:
+                    slot = self._pending.get(req_id)
+                    if slot:
+                        slot[1] = payload
+                        slot[0].set()
+                elif kind == REQUEST:
+                    await self._on_request(req_id, payload)
+                elif kind == PUSH:
+                    if self.on_push: self.on_push(payload)
+                elif kind == PING:
+                    await self._send(PONG, 0)
+        except (OSError, EOFError):
+            pass
+        except asyncio.CancelledError:
+            if not self.closed: raise   # отменили снаружи, а не close()
+        finally:
+            ka.cancel()
+            self.close()
+            self._task = None
+            await self._close_socket()
+
+    async def _close_socket(self):
+        # в MicroPython writer.close() ничего не делает, сокет
+        # закрывает только wait_closed()
+        try:
+            self.writer.close()
+            await self.writer.wait_closed()
+        except OSError:
+            pass
+
+    def close(self):
+        """Завершает ожидающие запросы, останавливает run() и закрывает сокет"""
+        if self.closed: return
+        self.closed = True
+        for slot in self._pending.values():
+            slot[1] = LinkClosed()
+            slot[0].set()
+        task = self._task
+        if task is None:
+            asyncio.create_task(self._close_socket())
+        elif task is not asyncio.current_task():
+            task.cancel()           # run() висит в readexactly, сокет закроет его finally
+
+
+class TcpClient:
+    """
+    Держит соединение с сервером, переподключается с паузой
+    backoff_ms .. max_backoff_ms (удваивается после каждой неудачи).
+
+    client = TcpClient('192.168.0.232', 5421)
+    client.start()
+    resp = await client.request(b'\\x01')
+    """
+    backoff_ms = 250
+    max_backoff_ms = 8000
+
+    def __init__(self, host, port, handler=None, on_push=None):
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.on_push = on_push
+        self.link = None
+        self.connected = asyncio.Event()
+        self.reconnects = 0
+        self._task = None
+
+    async def request(self, payload, timeout_ms=1000):
+        await self.connected.wait()
+        return await self.link.request(payload, timeout_ms)
+
+    async def push(self, payload):
+        await self.connected.wait()
+        await self.link.push(payload)
+
+    async def run(self):
+        delay = self.backoff_ms
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                print("TCP connect failed:", e, "retry in", delay, "ms")
+                await asyncio.sleep_ms(delay)
+                delay = min(delay * 2, self.max_backoff_ms)
+                continue
+            delay = self.backoff_ms
+            self.link = TcpLink(reader, writer, self.handler, self.on_push)
+            self.connected.set()
+            print(f"TCP connected to {self.host}:{self.port}")
+            await self.link.run()
+            self.connected.clear()
+            self.reconnects += 1
+            print("TCP link lost, reconnecting")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+
+class TcpServer:
+    """
+    server = TcpServer(5421, handler)
+    await server.start()
+    """
+    def __init__(self, port, handler=None, on_push=None, host='0.0.0.0'):
+        self.host = host
+        self.port = port
+        self.handler = handler
+        self.on_push = on_push
+        self.links = []
+        self.server = None
+
+    async def _serve(self, reader, writer):
+        link = TcpLink(reader, writer, self.handler, self.on_push)
+        self.links.append(link)
+        print('Client connected:', writer.get_extra_info('peername'))
+        try:
+            await link.run()
+        finally:
+            self.links.remove(link)
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve, self.host, self.port)
+        print('Listening on', self.host, self.port)
+        return self.server
@@ -0,0 +1,116 @@
+from machine import Pin
+from array import array
+import onewire, ds18x20
+import uasyncio as asyncio
+import time
+
+# Разрешение -> время конверсии, мс (по даташиту DS18B20)
+CONV_MS = {9: 94, 10: 188, 11: 375, 12: 750}
+
+
+class SensorBus:
+    """
+    Все DS18B20 на одной шине 1-Wire: одна широковещательная конверсия,
+    затем чтение всех ROM за один проход.
+    temps[i] - температура датчика roms[i] (nan при ошибке), stamp - ticks_ms.
+    """
+    def __init__(self, pin, resolution=12):
+        if not isinstance(pin, Pin): pin = Pin(pin)
+        self.ds = ds18x20.DS18X20(onewire.OneWire(pin))
+        self.roms = self.ds.scan()
+        if not self.roms:
+            raise Exception("DS18B20 not found!")
+
+        self.temps = array('f', [float('nan')] * len(self.roms))
+        self.stamp = None
+        self.errors = 0
+        self.set_resolution(resolution)
+
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def set_resolution(self, resolution):
+        """9..12 бит: 94, 188, 375 или 750 мс на конверсию"""
+        if resolution not in CONV_MS:
+            raise ValueError('Разрешение дб 9..12 бит')
+        self.resolution = resolution
+        self.conv_ms = CONV_MS[resolution]
+        config = ((resolution - 9) << 5) | 0x1F
+        for rom in self.roms:
+            if rom[0] == 0x28:  # только DS18B20 умеет менять разрешение
+                self.ds.write_scratch(rom, b'\x00\x00' + bytes([config]))
+        # младшие биты при пониженном разрешении не определены
+        self._mask = 0xFFFF ^ ((1 << (12 - resolution)) - 1)
+
+    def index(self, rom):
+        return self.roms.index(rom)
+
+    def _read_all(self):
+        for i, rom in enumerate(self.roms):
+            try:
+                if rom[0] != 0x28:
+                    self.temps[i] = self.ds.read_temp(rom)
+                    continue
+                buf = self.ds.read_scratch(rom)
+                t = (buf[1] << 8 | buf[0]) & self._mask
+                if t & 0x8000: t = -((t ^ 0xFFFF) + 1)
+                self.temps[i] = t / 16
+            except Exception:
+                self.temps[i] = float('nan')
+                self.errors += 1
+        self.stamp = time.ticks_ms()
+        return self.temps
+
+    def read(self):
+        """Блокирующее чтение всех датчиков"""
+        self.ds.convert_temp()
+        time.sleep_ms(self.conv_ms)
+        return self._read_all()
+
+    async def acquire(self):
+        """Одна конверсия для всех датчиков без блокировки платы"""
+        self.ds.convert_temp()
+        await asyncio.sleep_ms(self.conv_ms)
+        self._read_all()
+        self._ready.set()
+        self._ready.clear()
+        return self.temps
+
+    async def wait(self):
+        """Ждёт следующего замера задачи run()"""
+        await self._ready.wait()
+        return self.temps
+
+    def start(self, interval_ms=0):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(interval_ms))
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def run(self, interval_ms=0):
+        """Непрерывный опрос шины, interval_ms - пауза между замерами"""
+        try:
+            while True:
+                try:
+                    await self.acquire()
+                except onewire.OneWireError:
+                    self.errors += 1
+                if interval_ms: await asyncio.sleep_ms(interval_ms)
+        finally:
+            self._task = None
+
+
+def main():
+    bus = SensorBus(13, resolution=10)
+    print("Sensors:", bus.roms)
+    while True:
+        temps = bus.read()
+        print(bus.stamp, ' '.join(f"{t:.2f}°C" for t in temps))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+from array import array
+import uasyncio as asyncio
+import struct
+import time
+import os
+
+# Формат файла: заголовок MAGIC + <HH (версия, размер записи),
+# далее записи <Ifff: tick_ms, temp, setpoint, power.
+# Читается на ПК: tools/thermal_log.py
+MAGIC = b'THLG'
+VERSION = 1
+RECORD = '<Ifff'
+RECORD_SIZE = struct.calcsize(RECORD)
+
+_logs = []
+
+
+class ThermalLog:
+    """
+    Кольцевой буфер замеров (tick, temp, setpoint, power) на array,
+    периодически сбрасывается в бинарный файл на флеше.
+    Если файл больше max_bytes, он переименовывается в <path>.1
+    """
+    def __init__(self, path='thermal.log', size=256, flush_ms=30_000, max_bytes=256 * 1024):
+        self.path = path
+        self.size = size
+        self.flush_ms = flush_ms
+        self.max_bytes = max_bytes
+        self.ticks = array('I', [0] * size)
+        self.temp = array('f', [0] * size)
+        self.setpoint = array('f', [0] * size)
+        self.power = array('f', [0] * size)
+        self.head = 0           # следующий слот для записи
+        self.count = 0          # записей в буфере
+        self.unflushed = 0      # записей, ещё не сброшенных в файл
+        self.lost = 0           # перезаписанных до сброса
+        self._chunk = bytearray(RECORD_SIZE * 32)
+        self._task = None
+        _logs.append(self)
+
+    def add(self, temp, setpoint, power):
+        i = self.head
+        self.ticks[i] = time.ticks_ms()
+        self.temp[i] = temp
+        self.setpoint[i] = setpoint
+        self.power[i] = power
+        self.head = (i + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+        if self.unflushed == self.size: self.lost += 1
+        else: self.unflushed += 1
+
+    def last(self, n=None):
+        """Последние n замеров списком кортежей (старые первыми)"""
+        n = self.count if n is None else min(n, self.count)
+        res = []
+        for k in range(n, 0, -1):
+            i = (self.head - k) % self.size
+            res.append((self.ticks[i], self.temp[i], self.setpoint[i], self.power[i]))
+        return res
+
+    def _open(self):
+        try: size = os.stat(self.path)[6]
+        except OSError: size = 0
+        if size >= self.max_bytes:
+            try: os.remove(self.path + '.1')
+            except OSError: pass
+            os.rename(self.path, self.path + '.1')
+            size = 0
+        f = open(self.path, 'ab')
+        if size == 0: f.write(MAGIC + struct.pack('<HH', VERSION, RECORD_SIZE))
+        return f
+
+    def flush(self):
+        """Дописывает в файл накопленные записи пачками по 32"""
+        n = self.unflushed
+        if not n: return 0
+        per_chunk = len(self._chunk) // RECORD_SIZE
+        mv = memoryview(self._chunk)
+        with self._open() as f:
+            start = (self.head - n) % self.size
+            done = 0
+            while done < n:
+                k = min(per_chunk, n - done)
+                for j in range(k):
+                    i = (start + done + j) % self.size
+                    struct.pack_into(RECORD, self._chunk, j * RECORD_SIZE,
+                                     self.ticks[i], self.temp[i], self.setpoint[i], self.power[i])
+                f.write(mv[:k * RECORD_SIZE])
+                done += k
+        self.unflushed = 0
+        return n
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        while True:
+            await asyncio.sleep_ms(self.flush_ms)
+            try: self.flush()
+            except OSError as e: print('ThermalLog:', e)
+
+
+def flush_all():
+    """Для выгрузки с ПК: сбросить все логи перед скачиванием файла"""
+    for log in _logs: log.flush()
+    return [log.path for log in _logs]
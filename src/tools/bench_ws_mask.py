@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# bench_ws_mask.py
+# Compares the WebSocket masking variants of lib/ws_client.py.
+# Runs on the host (python src/tools/bench_ws_mask.py) and on the board
+# (copy next to ws_client.py), where the viper variant is available too.
+import os
+import sys
+
+try:
+    from time import ticks_us, ticks_diff
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us(): return int(perf_counter() * 1_000_000)
+    def ticks_diff(a, b): return a - b
+
+try:
+    import ws_client
+except ImportError:
+    sys.path.append(os.path.join(os.path.dirname(__file__), "..", "..", "lib"))
+    import ws_client
+
+SIZES = (16, 256, 1024, 4096)
+ROUNDS = 20
+MASK = b"\x12\x34\x56\x78"
+
+
+def bench(name, fn, size):
+    buf = bytearray(os.urandom(size))
+    start = ticks_us()
+    for _ in range(ROUNDS):
+        fn(buf, size)
+    us = ticks_diff(ticks_us(), start) / ROUNDS
+    print("{:<10} {:>6} B {:>10.1f} us {:>8.3f} us/B".format(name, size, us, us / size))
+
+
+def check(fn):
+    # shorter and longer than mask_python's chunk, odd tails
+    for size in (37, 203):
+        data = bytearray(os.urandom(size))
+        expected = ws_client.mask_generator(data, MASK)
+        fn(data, len(data))
+        assert bytes(data) == expected, "mask mismatch"
+
+
+def main():
+    variants = [
+        ("generator", lambda buf, n: ws_client.mask_generator(buf, MASK)),
+        ("python", lambda buf, n: ws_client.mask_python(buf, n, MASK)),
+    ]
+    if ws_client.mask_viper is not None:
+        word = ws_client._mask_word(MASK)
+        variants.append(("viper", lambda buf, n: ws_client.mask_viper(buf, n, word)))
+
+    for name, fn in variants[1:]:
+        check(fn)
+
+    for size in SIZES:
+        for name, fn in variants:
+            bench(name, fn, size)
+
+
+if __name__ == "__main__":
+    main()
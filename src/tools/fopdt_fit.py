@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+# fopdt_fit.py
+# Fits a first order plus dead time model to a heater log (thermlog.py):
+#
+#   tau * dT/dt = K * u(t - theta) - (T - ambient)
+#
+#   python tools/fopdt_fit.py thermal.log [--name heater] [-o model.json]
+#
+# The result is merged into model.json under the heater name; `make model`
+# uploads it, HeatingSystem loads it on start (ThermalModel.load).
+import json
+import os
+import sys
+import numpy as np
+
+try:
+    from thermal_log import read_log
+except ImportError:
+    from tools.thermal_log import read_log
+
+
+def resample(log, dt):
+    t = log["t"]
+    grid = np.arange(t[0], t[-1], dt)
+    temp = np.interp(grid, t, log["temp"])
+    # the heater power is held between samples, no interpolation
+    idx = np.searchsorted(t, grid, side="right") - 1
+    power = log["power"][idx].astype(float)
+    return grid, temp, power
+
+
+def fit_fopdt(t, temp, power, dt, max_delay_s=120):
+    """
+    Least squares fit of the discrete model
+        T[k+1] = a*T[k] + b*u[k-d] + c
+    for every dead time d, the best residual wins.
+    Returns dict(K, tau, theta, ambient, rmse).
+    """
+    best = None
+    max_d = min(int(max_delay_s / dt), len(t) // 4)
+    for d in range(max_d + 1):
+        y = temp[d + 1:]
+        X = np.column_stack((temp[d:-1], power[:len(power) - d - 1], np.ones(len(y))))
+        coef, *_ = np.linalg.lstsq(X, y, rcond=None)
+        rmse = np.sqrt(np.mean((X @ coef - y) ** 2))
+        if best is None or rmse < best[0]:
+            best = (rmse, d, coef)
+
+    rmse, d, (a, b, c) = best
+    if not 0 < a < 1:
+        raise ValueError("log has no usable step response (unstable fit)")
+    return {
+        "K": float(b / (1 - a)),
+        "tau": float(-dt / np.log(a)),
+        "theta": float(d * dt),
+        "ambient": float(c / (1 - a)),
+        "rmse": float(rmse),
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("usage: fopdt_fit.py LOG [--name NAME] [-o model.json] [--dt SECONDS]")
+        sys.exit(1)
+
+    opt = lambda key, default: args[args.index(key) + 1] if key in args else default
+    name = opt("--name", "heater")
+    out = opt("-o", "model.json")
+    log = read_log(args[0])
+    dt = float(opt("--dt", np.median(np.diff(log["t"]))))
+
+    model = fit_fopdt(*resample(log, dt), dt)
+    print(f"{name}: K={model['K']:.4f} °C/% tau={model['tau']:.1f}s "
+          f"theta={model['theta']:.1f}s ambient={model['ambient']:.1f}°C rmse={model['rmse']:.3f}")
+
+    models = {}
+    if os.path.exists(out):
+        with open(out) as f:
+            models = json.load(f)
+    models[name] = model
+    with open(out, "w") as f:
+        json.dump(models, f)
+    print("saved", out)
+
+
+if __name__ == "__main__":
+    main()
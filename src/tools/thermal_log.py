@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# thermal_log.py
+# Reader for the binary heater log written by thermlog.py on the board.
+#
+#   python tools/thermal_log.py thermal.log [--csv out.csv]
+#
+#   from tools.thermal_log import read_log
+#   log = read_log("thermal.log")   # log["t"], log["temp"], log["setpoint"], log["power"]
+import sys
+import numpy as np
+
+MAGIC = b"THLG"
+HEADER_SIZE = 8
+TICKS_PERIOD = 1 << 30  # MicroPython ticks_ms wraps here
+
+RECORD_DTYPE = np.dtype([
+    ("tick", "<u4"),
+    ("temp", "<f4"),
+    ("setpoint", "<f4"),
+    ("power", "<f4"),
+])
+
+
+def unwrap_ticks(ticks):
+    """ticks_ms -> monotonic seconds since the first sample"""
+    diff = np.diff(ticks.astype(np.int64)) % TICKS_PERIOD
+    return np.concatenate(([0], np.cumsum(diff))) / 1000.0
+
+
+def read_log(path):
+    """Loads the whole log into a dict of numpy arrays, `t` is in seconds."""
+    with open(path, "rb") as f:
+        header = f.read(HEADER_SIZE)
+        if header[:4] != MAGIC:
+            raise ValueError(f"{path}: not a thermal log")
+        version, record_size = np.frombuffer(header[4:], "<u2")
+        if record_size != RECORD_DTYPE.itemsize:
+            raise ValueError(f"{path}: unsupported record size {record_size} (v{version})")
+        data = f.read()
+
+    # a record cut by a reset at the end of the file is dropped
+    usable = len(data) - len(data) % record_size
+    records = np.frombuffer(data[:usable], RECORD_DTYPE)
+    log = {name: records[name] for name in RECORD_DTYPE.names}
+    log["t"] = unwrap_ticks(records["tick"]) if len(records) else np.zeros(0)
+    return log
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__ or "usage: thermal_log.py LOG [--csv OUT]")
+        sys.exit(1)
+
+    log = read_log(args[0])
+    n = len(log["t"])
+    print(f"{args[0]}: {n} samples, {log['t'][-1] if n else 0:.0f} s")
+    if n:
+        err = log["temp"] - log["setpoint"]
+        print(f"temp {log['temp'].min():.2f}..{log['temp'].max():.2f} °C, "
+              f"max overshoot {err.max():.2f} °C, mean power {log['power'].mean():.1f} %")
+
+    if "--csv" in args:
+        out = args[args.index("--csv") + 1]
+        table = np.column_stack((log["t"], log["temp"], log["setpoint"], log["power"]))
+        np.savetxt(out, table, delimiter=",", header="t,temp,setpoint,power", comments="", fmt="%.3f")
+        print("saved", out)
+
+
+if __name__ == "__main__":
+    main()
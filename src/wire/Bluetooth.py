@@ -1,112 +1,41 @@
-import network
-import bluetooth
-import socket
-import time
+import uasyncio as asyncio
+import esp32
 from machine import Pin
+from ble_peripheral import BlePeripheral
 
-PORT = 5421
-MASTER = '192.168.0.123'
-SLAVE = '192.168.0.232'
+# Команды (первый байт записи в CMD)
+CMD_LED = 0x01          # <B 1 - включить, 0 - выключить
+CMD_RATE = 0x02         # <H период телеметрии, мс
 
 led = Pin(2, Pin.OUT)
 button = Pin(0, Pin.IN, Pin.PULL_UP)
+presses = 0
+period_ms = 10
 
-bt = bluetooth.Bluetooth()
-bt.active(True)
+def on_button(p):
+    global presses
+    presses += 1
 
-def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
-    sta = network.WLAN(network.STA_IF); sta.active(True)
-    if not sta.isconnected():
-        print("Connecting to WiFi...")
-        sta.connect(ssid, password)
-        t_start = time.ticks_ms()
-        while time.ticks_diff(time.ticks_ms(), t_start) < 1e5: 
-            if sta.isconnected(): break
-            time.sleep_ms(500)
-        else: raise Exception("WiFi connect failed")
-    return sta.ifconfig()[0]
+def read_temp():
+    try: return esp32.mcu_temperature()
+    except AttributeError: return (esp32.raw_temperature() - 32) / 1.8
 
-def button_pressed():
-    return button.value() == 0
-
-# -------------------- SLAVE --------------------
-def run_slave():
-    print("Starting Bluetooth SLAVE...")
-    bt.config(name="ESP32_SLAVE")
-    bt.advertise(name="ESP32_SLAVE")
-
-    conn = None
-
-    @bt.on_connect
-    def on_connect(c):
-        nonlocal conn
-        conn = c
-        print("Master connected via Bluetooth:", c)
-
-        @c.on_recv
-        def on_recv(data):
-            cmd = data.decode().strip()
-            print("Received command:", cmd)
-            if cmd == "ON":
-                led.value(1)
-                c.send(b"OK: LED ON\n")
-            elif cmd == "OFF":
-                led.value(0)
-                c.send(b"OK: LED OFF\n")
-            else:
-                c.send(b"ERROR: Unknown command\n")
+def set_rate(args):
+    global period_ms
+    period_ms = max(1, args[0] | args[1] << 8)
 
+async def telemetry(p):
     while True:
-        time.sleep(1)
-
-# -------------------- MASTER --------------------
-def run_master():
-    print("Starting Bluetooth MASTER...")
-    bt.config(name="ESP32_MASTER")
-    print("Scanning for ESP32_SLAVE...")
-
-    devices = bt.discover()
-    target = None
-
-    for d in devices:
-        name, addr = d[0], d[1]
-        print("Found:", name, addr)
-        if name == "ESP32_SLAVE":
-            target = addr
-            break
-
-    if not target:
-        raise Exception("Slave not found")
-
-    print("Connecting to ESP32_SLAVE", target)
-    conn = bt.connect(target)
-    print("Connected!")
-
-    try:
-        while True:
-            time.sleep_ms(50)
-            if button_pressed():
-                cmd = "ON"
-                print("Sending:", cmd)
-                conn.send(cmd.encode() + b"\n")
-
-                time.sleep_ms(100)
-                while button_pressed():
-                    time.sleep_ms(50)
-
-                cmd = "OFF"
-                print("Sending:", cmd)
-                conn.send(cmd.encode() + b"\n")
-    except Exception as e:
-        print("Error:", e)
-    finally:
-        conn.close()
-
-# -------------------- MAIN --------------------
-sta = network.WLAN(network.STA_IF)
-if not sta.isconnected(): connect_wifi("TP-Link_0D14", "24827089")
-net = sta.ifconfig()[0]
-ROLE = "MASTER" if net == MASTER else "SLAVE"
-print("Device role:", ROLE)
-if ROLE == "MASTER": run_master()
-else: run_slave()
+        p.add(presses, read_temp())    # позиция - пока счётчик нажатий
+        await asyncio.sleep_ms(period_ms)
+
+async def main():
+    print("Starting Bluetooth peripheral...")
+    p = BlePeripheral("ESP32_SLAVE")
+    p.on(CMD_LED, lambda args: led.value(args[0]))
+    p.on(CMD_RATE, set_rate)
+    button.irq(on_button, Pin.IRQ_FALLING)
+    p.start(flush_ms=50)
+    await telemetry(p)
+
+asyncio.run(main())
@@ -1,6 +1,8 @@
 import time
 from machine import Pin, UART
 import network
+import uasyncio as asyncio
+from rs485_bus import RS485, RS485Master, RS485Slave
 
 def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
     sta = network.WLAN(network.STA_IF); sta.active(True)
@@ -17,14 +19,13 @@ def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
 TX_PIN = 17; RX_PIN = 16; DE_PIN = 4  
 uart = UART(2, baudrate=115200, tx=Pin(TX_PIN), rx=Pin(RX_PIN))
 de = Pin(DE_PIN, Pin.OUT)
-de.value(0)  
 led = Pin(2, Pin.OUT)
 button = Pin(0, Pin.IN, Pin.PULL_UP)
 
-def blink(d=0.05, f=0.05, n=3):
+async def blink(d=50, f=50, n=3):
     for _ in range(n):
-        led.on(); time.sleep(f)
-        led.off(); time.sleep(d)
+        led.on(); await asyncio.sleep_ms(f)
+        led.off(); await asyncio.sleep_ms(d)
 
 def button_pressed():
     return button.value() == 0
@@ -35,52 +36,47 @@ if not sta.isconnected():
 net = sta.ifconfig()[0]
 _board = 1 if net == '192.168.0.123' else 2
 
+# Команды протокола
+CMD_STATUS = 0x01; CMD_RUN_TASK = 0x02
+SLAVES = [2]        # адреса слейвов на шине
 
 print(f"Board mode: {'MASTER' if _board==1 else 'SLAVE'}")
+bus = RS485(uart, de)
 
-if _board == 1:  # MASTER
+
+async def master():
+    m = RS485Master(bus)
+    m.start()
+
+    async def watch_button():
+        while True:
+            if button_pressed():
+                for addr in SLAVES:
+                    try: print(addr, "RUN_TASK:", await m.request(addr, CMD_RUN_TASK))
+                    except asyncio.TimeoutError: print(addr, "RUN_TASK: timeout")
+                led.on()
+                while button_pressed(): await asyncio.sleep_ms(20)
+                led.off()
+            await asyncio.sleep_ms(20)
+
+    asyncio.create_task(watch_button())
+    t0 = time.ticks_ms()
     while True:
-        if button_pressed():
-            msg = b"RUN_TASK\n"
-            de.value(1)  # включаем передачу
-            uart.write(msg)
-            de.value(0)
-            try:
-                print("Sent command:", msg.decode().strip())
-            except UnicodeError:
-                print("Sent command (decode error)")
+        await m.poll([(addr, CMD_STATUS, b'') for addr in SLAVES])
+        if time.ticks_diff(time.ticks_ms(), t0) > 5000:
+            t0 = time.ticks_ms()
+            print("Stats [ok, timeouts, rtt_us]:", m.stats, "CRC errors:", bus.crc_errors)
 
-            led.on()
-            while button_pressed(): time.sleep_ms(50)
-            led.off()
 
-        if uart.any():
-            resp = uart.readline()
-            if resp:
-                try:
-                    print("Got response:", resp.decode(errors="ignore").strip())
-                except UnicodeError:
-                    print("Got response (decode error)")
+async def slave():
+    s = RS485Slave(bus, _board)
+    s.on(CMD_STATUS, lambda payload: b'OK')
+    def run_task(payload):
+        print("Got command: RUN_TASK")
+        asyncio.create_task(blink())
+        return b'OK'
+    s.on(CMD_RUN_TASK, run_task)
+    await s.run()
 
-        time.sleep_ms(100)
 
-else:  # SLAVE
-    while True:
-        if uart.any():
-            line = uart.readline()
-            if line:
-                try:
-                    cmd = line.decode(errors="ignore").strip()
-                except UnicodeError:
-                    cmd = ""  # если не получилось декодировать
-                if cmd:
-                    print("Got command:", cmd)
-                    if cmd == "RUN_TASK":
-                        status = "OK"
-                        blink()
-                    else:
-                        status = "UNKNOWN"
-                    de.value(1)
-                    uart.write((status + "\n").encode())
-                    de.value(0)
-        time.sleep_ms(50)
+asyncio.run(master() if _board == 1 else slave())
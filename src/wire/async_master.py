@@ -3,6 +3,7 @@ import machine
 import time
 
 from machine import Pin, UART
+from uart_link import UartLink
 
 def blink(led, d=0.05, f=0.05, n=3):
     for _ in range(n):
@@ -11,42 +12,47 @@ def blink(led, d=0.05, f=0.05, n=3):
         led.off()
         time.sleep(d)
 
-async def handle_button(uart, led, button):
+# Типы сообщений (первый байт кадра)
+MSG_BUTTON = 0x01   # payload: 1 - нажата, 0 - отпущена
+
+async def handle_button(link, led, button):
+    flag = asyncio.ThreadSafeFlag()
+    button.irq(lambda p: flag.set(), Pin.IRQ_FALLING | Pin.IRQ_RISING)
+    msg = bytearray(2)
+    msg[0] = MSG_BUTTON
     last_pressed = False
     while True:
+        await flag.wait()
+        await asyncio.sleep_ms(10)  # дребезг
         pressed = button.value() == 0
-        if pressed and not last_pressed:
-            uart.write(b'Hello!\n')
-            print(f"Sent Hello!")
-            led.on()
-        elif not pressed and last_pressed:
-            led.off()
+        if pressed == last_pressed: continue
         last_pressed = pressed
-        await asyncio.sleep_ms(20)
+        msg[1] = pressed
+        await link.send(msg)
+        led.value(pressed)
 
-async def handle_uart(uart):
+async def handle_uart(link, led):
     while True:
-        if uart.any():
-            data = uart.readline()
-            if data:
-                try:
-                    msg = data.decode().strip()
-                    print("Got:", msg)
-                except UnicodeError:
-                    print("Received non-UTF8 data")
-        await asyncio.sleep_ms(20)
+        msg = await link.recv()
+        if not msg: continue    # пустой кадр, например шум на линии
+        if msg[0] == MSG_BUTTON and len(msg) == 2:
+            print("Got button:", msg[1])
+            led.value(msg[1])
+        else:
+            print("Got unknown message:", bytes(msg))
 
 async def bundle(board, *, button_pin=0, led_pin=2):
     tx, rx = (16, 17) if board == 1 else (17, 16)
     uart = UART(2, baudrate=115200, tx=Pin(tx), rx=Pin(rx))
+    link = UartLink(uart)
     button = Pin(button_pin, Pin.IN, Pin.PULL_UP)
     led = Pin(led_pin, Pin.OUT)
     
     print(f"Master/Slave mode started on board {board}")
     
     await asyncio.gather(
-        handle_button(uart, led, button),
-        handle_uart(uart)
+        handle_button(link, led, button),
+        handle_uart(link, led)
     )
 
 # Пример использования:
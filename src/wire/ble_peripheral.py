@@ -0,0 +1,156 @@
+# ble_peripheral.py
+# GATT-периферия на ubluetooth: команды - запись без ответа в CMD,
+# телеметрия - уведомления TELEMETRY, по несколько замеров в пакете.
+#
+# Команда:    <B код, далее аргументы (формат знает обработчик)
+# Телеметрия: <BB seq, count, затем count записей SAMPLE
+import bluetooth
+import struct
+import time
+import uasyncio as asyncio
+from micropython import const
+
+_IRQ_CENTRAL_CONNECT = const(1)
+_IRQ_CENTRAL_DISCONNECT = const(2)
+_IRQ_GATTS_WRITE = const(3)
+_IRQ_MTU_EXCHANGED = const(21)
+
+_FLAG_READ = const(0x0002)
+_FLAG_WRITE_NO_RESPONSE = const(0x0004)
+_FLAG_WRITE = const(0x0008)
+_FLAG_NOTIFY = const(0x0010)
+
+SERVICE_UUID = bluetooth.UUID('6e400001-b5a3-f393-e0a9-e50e24dcca9e')
+CMD_UUID = bluetooth.UUID('6e400002-b5a3-f393-e0a9-e50e24dcca9e')
+TELEMETRY_UUID = bluetooth.UUID('6e400003-b5a3-f393-e0a9-e50e24dcca9e')
+
+SAMPLE = struct.Struct('<Iif')      # ticks_ms, позиция (шаги), температура
+BATCH_HEADER = struct.Struct('<BB')
+ATT_OVERHEAD = 3                    # заголовок ATT в уведомлении
+DEFAULT_MTU = 23
+ADV_MAX = 31                        # legacy advertising, на каждый пакет
+
+
+def adv_payload(name=None, service=None, flags=True):
+    """adv_data или resp_data; каждый пакет рекламы - не больше ADV_MAX байт"""
+    payload = bytearray(b'\x02\x01\x06' if flags else b'')   # general discoverable, no BR/EDR
+    if name is not None:
+        name = name.encode()
+        room = ADV_MAX - len(payload) - 2
+        kind = 0x09                                 # полное имя
+        if len(name) > room:
+            name, kind = name[:room], 0x08          # сокращённое имя
+        payload += struct.pack('BB', len(name) + 1, kind) + name
+    if service is not None:
+        b = bytes(service)
+        payload += struct.pack('BB', len(b) + 1, 0x07 if len(b) == 16 else 0x03) + b
+    if len(payload) > ADV_MAX:
+        raise ValueError("advertising payload > %d bytes" % ADV_MAX)
+    return payload
+
+
+class BlePeripheral:
+    """
+    p = BlePeripheral('ESP32_HEATER')
+    p.on(0x01, lambda args: led.value(args[0]))
+    p.add(position, temp)     # копится в пакет, уходит при заполнении MTU
+    p.start(flush_ms=50)
+    """
+    def __init__(self, name, mtu=247, cmd_size=64):
+        self.name = name
+        self.ble = bluetooth.BLE()
+        self.ble.active(True)
+        self.ble.config(mtu=mtu)                # наше предложение для обмена MTU
+        self.ble.irq(self._irq)
+        ((self._cmd, self._tlm),) = self.ble.gatts_register_services((
+            (SERVICE_UUID, (
+                (CMD_UUID, _FLAG_WRITE | _FLAG_WRITE_NO_RESPONSE),
+                (TELEMETRY_UUID, _FLAG_READ | _FLAG_NOTIFY),
+            )),
+        ))
+        self.ble.gatts_set_buffer(self._cmd, cmd_size)
+
+        self.handlers = {}          # код -> handler(memoryview аргументов)
+        self.conns = {}             # conn_handle -> mtu
+        self._batch = bytearray(mtu - ATT_OVERHEAD)
+        self._count = 0
+        self._seq = 0
+        self._task = None
+        self.dropped = 0
+        # flags + имя и 128-битный UUID вместе не влезают в 31 байт:
+        # UUID уходит в ответ на scan request
+        self._adv = adv_payload(name=name)
+        self._resp = adv_payload(service=SERVICE_UUID, flags=False)
+        self.advertise()
+
+    def advertise(self, interval_us=100_000):
+        self.ble.gap_advertise(interval_us, adv_data=self._adv, resp_data=self._resp)
+
+    def on(self, code, handler):
+        self.handlers[code] = handler
+
+    def request_mtu(self, conn):
+        """Обмен MTU по инициативе периферии, результат придёт в _IRQ_MTU_EXCHANGED"""
+        try: self.ble.gattc_exchange_mtu(conn)
+        except OSError: pass
+
+    def batch_capacity(self):
+        """Сколько замеров помещается в одно уведомление при текущем MTU"""
+        mtu = min(self.conns.values()) if self.conns else DEFAULT_MTU
+        room = min(mtu - ATT_OVERHEAD, len(self._batch)) - BATCH_HEADER.size
+        return max(1, room // SAMPLE.size)
+
+    def _irq(self, event, data):
+        if event == _IRQ_CENTRAL_CONNECT:
+            conn = data[0]
+            self.conns[conn] = DEFAULT_MTU
+            self.request_mtu(conn)
+        elif event == _IRQ_CENTRAL_DISCONNECT:
+            self.conns.pop(data[0], None)
+            self.advertise()
+        elif event == _IRQ_MTU_EXCHANGED:
+            conn, mtu = data
+            if conn in self.conns: self.conns[conn] = mtu
+        elif event == _IRQ_GATTS_WRITE:
+            if data[1] != self._cmd: return
+            cmd = self.ble.gatts_read(self._cmd)
+            if not cmd: return
+            handler = self.handlers.get(cmd[0])
+            if handler:
+                try: handler(memoryview(cmd)[1:])
+                except Exception as e: print("BLE command error:", cmd[0], e)
+
+    # --- телеметрия ---
+
+    def add(self, position, temp):
+        """Добавляет замер в пакет; полный пакет уходит сразу"""
+        if not self.conns:
+            return
+        SAMPLE.pack_into(self._batch, BATCH_HEADER.size + self._count * SAMPLE.size,
+                         time.ticks_ms(), position, temp)
+        self._count += 1
+        if self._count >= self.batch_capacity():
+            self.flush()
+
+    def flush(self):
+        n = self._count
+        if not n: return
+        self._count = 0
+        self._seq = (self._seq + 1) & 0xFF
+        BATCH_HEADER.pack_into(self._batch, 0, self._seq, n)
+        data = memoryview(self._batch)[:BATCH_HEADER.size + n * SAMPLE.size]
+        self.ble.gatts_write(self._tlm, data)
+        for conn in self.conns:
+            try: self.ble.gatts_notify(conn, self._tlm)
+            except OSError: self.dropped += 1   # стек занят, пакет потерян
+
+    async def run(self, flush_ms):
+        while True:
+            await asyncio.sleep_ms(flush_ms)
+            self.flush()
+
+    def start(self, flush_ms=50):
+        """Периодически отправляет неполный пакет, чтобы задержка не росла"""
+        if self._task is None:
+            self._task = asyncio.create_task(self.run(flush_ms))
+        return self._task
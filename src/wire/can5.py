@@ -1,9 +1,12 @@
 from machine import Pin
 import network, CAN
+import uasyncio as asyncio
 import time
+from can_node import CanNode, PRIO_HIGH, PRIO_NORMAL
+from can_isotp import IsoTp
 
 CAN_TX = 5; CAN_RX = 4; LED_PIN = 2; BUTTON_PIN = 0
-CMD_CAN_ID = 0x100; MASTER_IP = "192.168.0.123"; LOOPBACK = False  
+CMD_CAN_ID = 0x100; DATA_IDS = (0x700, 0x708); MASTER_IP = "192.168.0.123"; LOOPBACK = False  
 
 def connect_wifi(timeout = 15):
     WIFI_SSID = "TP-Link_0D14"; WIFI_PASS = "24827089"
@@ -28,34 +31,48 @@ can = CAN(0, tx=CAN_TX, rx=CAN_RX,
 
 print("CAN bus ready (TX→TX, RX→RX)")
 
-def send_cmd(cmd: str):
-    data = cmd.encode('utf-8')
-    if len(data) > 8:
-        print(f"CMD too long: {cmd}")
-        return
-    can.send(list(data), CMD_CAN_ID)
-    print(f"→ {cmd}")
-
-def parse_cmd(data: bytes) -> str:
-    try: return data.decode('utf-8').strip()
-    except: return ""
-
-def button_pressed(): return button.value() == 0
-print("Running...")
-while True:
-    time.sleep_ms(50)
-    if button_pressed():
-        cmd = "ON"; print("Sending:", cmd); send_cmd(cmd)
-        while button_pressed(): time.sleep_ms(50)
-        cmd = "OFF"; print("Sending:", cmd); send_cmd(cmd)
-    if can.any():
-        try:
-            msg_id, _, _, data_bytes = can.recv()
-            if msg_id == CMD_CAN_ID:
-                cmd = parse_cmd(bytes(data_bytes))
-                if cmd:
-                    print(f"CMD: {cmd}")
-                    if cmd == "ON": led.value(1)
-                    elif cmd == "OFF": led.value(0)
-        except Exception as e: print("CAN recv error:", e)
-    time.sleep_ms(10)
\ No newline at end of file
+# Бинарные команды: 1 байт кода вместо строк "ON"/"OFF"
+CMD_FMT = '<B'
+CMD_OFF = 0; CMD_ON = 1
+
+node = CanNode(can)
+
+def on_cmd(code):
+    print("CMD:", code)
+    if code == CMD_ON: led.value(1)
+    elif code == CMD_OFF: led.value(0)
+
+node.on(CMD_CAN_ID, CMD_FMT, on_cmd)
+
+# Длинные данные (массивы позиций, конфиги) - сегментами ISO-TP
+tx_id, rx_id = DATA_IDS if MY_IP == MASTER_IP else DATA_IDS[::-1]
+link = IsoTp(node, tx_id, rx_id)
+
+async def watch_data():
+    while True:
+        data = await link.recv()
+        print(f"DATA {len(data)} bytes")
+
+def send_cmd(code, prio=PRIO_NORMAL):
+    node.send(CMD_CAN_ID, CMD_FMT, code, prio=prio)
+    print(f"→ {code}")
+
+async def watch_button():
+    flag = asyncio.ThreadSafeFlag()
+    button.irq(lambda p: flag.set(), Pin.IRQ_FALLING | Pin.IRQ_RISING)
+    pressed = False
+    while True:
+        await flag.wait()
+        await asyncio.sleep_ms(20)  # дребезг
+        now = button.value() == 0
+        if now != pressed:
+            pressed = now
+            send_cmd(CMD_ON if now else CMD_OFF, PRIO_HIGH)
+
+async def main():
+    node.start()
+    asyncio.create_task(watch_data())
+    print("Running...")
+    await watch_button()
+
+asyncio.run(main())
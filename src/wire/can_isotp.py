@@ -0,0 +1,177 @@
+# can_isotp.py
+# Сегментированная передача поверх CanNode в духе ISO 15765-2 (ISO-TP):
+# до 4095 байт одним сообщением, flow control с размером блока (BS) и
+# минимальным интервалом между кадрами (STmin).
+#
+# Кадры (первый байт - PCI):
+#   SF  0x0L          L = 1..7 байт данных
+#   FF  0x1L LL       12 бит длины, 6 байт данных
+#   CF  0x2N          N = номер кадра 0..15, 7 байт данных
+#   FC  0x3S BS STmin S: 0 - продолжай, 1 - жди, 2 - переполнение
+import uasyncio as asyncio
+import time
+
+SF = 0x00; FF = 0x10; CF = 0x20; FC = 0x30
+FC_CTS = 0; FC_WAIT = 1; FC_OVERFLOW = 2
+MAX_LEN = 4095
+
+
+class IsoTpError(Exception):
+    pass
+
+
+class IsoTp:
+    """
+    Канал точка-точка: отправка на tx_id, приём (данных и FC) на rx_id.
+    У второй стороны tx_id и rx_id меняются местами.
+
+    link = IsoTp(node, 0x700, 0x708)
+    await link.send(bytes(100))
+    data = await link.recv()
+    """
+    timeout_ms = 1000   # ожидание FC у отправителя и CF у получателя (N_Bs, N_Cr)
+    max_wait = 8        # сколько FC "жди" подряд терпим
+
+    def __init__(self, node, tx_id, rx_id, bs=8, stmin_ms=1, max_len=MAX_LEN, on_message=None):
+        self.node = node
+        self.tx_id = tx_id
+        self.rx_id = rx_id
+        self.bs = bs                    # наш размер блока для входящих (0 - без FC)
+        self.stmin_ms = stmin_ms        # наш STmin для входящих
+        self.max_len = max_len
+        self.on_message = on_message
+
+        self._frame = bytearray(8)
+        self._tx_lock = asyncio.Lock()
+        self._fc = None                 # (статус, BS, STmin) последнего FC
+        self._fc_event = asyncio.Event()
+
+        self._rx_buf = None
+        self._rx_pos = 0
+        self._rx_seq = 0
+        self._rx_block = 0
+        self._rx_stamp = 0
+        self._inbox = []
+        self._inbox_event = asyncio.Event()
+        self.errors = 0
+
+        node.on(rx_id, None, self._on_frame)
+
+    # --- отправка ---
+
+    def _put(self, n):
+        self.node.send(self.tx_id, None, bytes(self._frame[:n]))
+
+    def _flow(self, status, bs=0, stmin=0):
+        self.node.send(self.tx_id, None, bytes((FC | status, bs, stmin)))
+
+    async def _wait_fc(self):
+        for _ in range(self.max_wait):
+            self._fc_event.clear()
+            try: await asyncio.wait_for_ms(self._fc_event.wait(), self.timeout_ms)
+            except asyncio.TimeoutError: raise IsoTpError("FC timeout")
+            status, bs, stmin = self._fc
+            if status == FC_CTS:
+                # 0xF1..0xF9 - сотни мкс, округляем до 1 мс
+                return bs, (stmin if stmin <= 0x7F else 1)
+            if status == FC_OVERFLOW:
+                raise IsoTpError("receiver overflow")
+        raise IsoTpError("too many FC wait")
+
+    async def send(self, data):
+        n = len(data)
+        if n > MAX_LEN:
+            raise ValueError("ISO-TP payload > 4095 bytes")
+        f = self._frame
+        async with self._tx_lock:
+            if n <= 7:
+                f[0] = SF | n
+                f[1:1 + n] = data
+                self._put(1 + n)
+                return
+
+            mv = memoryview(data)
+            f[0] = FF | (n >> 8)
+            f[1] = n & 0xFF
+            f[2:8] = mv[:6]
+            self._put(8)
+            pos = 6
+            seq = 1
+            bs, stmin = await self._wait_fc()
+            block = 0
+            while pos < n:
+                k = min(7, n - pos)
+                f[0] = CF | seq
+                f[1:1 + k] = mv[pos:pos + k]
+                self._put(1 + k)
+                pos += k
+                seq = (seq + 1) & 0x0F
+                block += 1
+                if pos >= n: break
+                if bs and block == bs:
+                    bs, stmin = await self._wait_fc()
+                    block = 0
+                elif stmin:
+                    await asyncio.sleep_ms(stmin)
+                else:
+                    await asyncio.sleep_ms(0)
+
+    # --- приём ---
+
+    def _on_frame(self, data):
+        pci = data[0] & 0xF0
+        if pci == CF: self._on_cf(data)
+        elif pci == SF: self._deliver(bytes(data[1:1 + (data[0] & 0x0F)]))
+        elif pci == FF: self._on_ff(data)
+        elif pci == FC:
+            self._fc = (data[0] & 0x0F, data[1], data[2])
+            self._fc_event.set()
+
+    def _on_ff(self, data):
+        n = ((data[0] & 0x0F) << 8) | data[1]
+        if n > self.max_len:
+            self._flow(FC_OVERFLOW)
+            self.errors += 1
+            return
+        self._rx_buf = bytearray(n)
+        self._rx_buf[:6] = data[2:8]
+        self._rx_pos = 6
+        self._rx_seq = 1
+        self._rx_block = 0
+        self._rx_stamp = time.ticks_ms()
+        self._flow(FC_CTS, self.bs, self.stmin_ms)
+
+    def _on_cf(self, data):
+        buf = self._rx_buf
+        if buf is None: return
+        if ((data[0] & 0x0F) != self._rx_seq or
+                time.ticks_diff(time.ticks_ms(), self._rx_stamp) > self.timeout_ms):
+            self._rx_buf = None         # потерян кадр - сообщение отбрасываем
+            self.errors += 1
+            return
+        k = min(7, len(buf) - self._rx_pos, len(data) - 1)
+        buf[self._rx_pos:self._rx_pos + k] = data[1:1 + k]
+        self._rx_pos += k
+        self._rx_seq = (self._rx_seq + 1) & 0x0F
+        self._rx_stamp = time.ticks_ms()
+        if self._rx_pos >= len(buf):
+            self._rx_buf = None
+            self._deliver(buf)
+            return
+        self._rx_block += 1
+        if self.bs and self._rx_block == self.bs:
+            self._rx_block = 0
+            self._flow(FC_CTS, self.bs, self.stmin_ms)
+
+    def _deliver(self, data):
+        if self.on_message:
+            self.on_message(data)
+        else:
+            self._inbox.append(data)
+            self._inbox_event.set()
+
+    async def recv(self):
+        while not self._inbox:
+            self._inbox_event.clear()
+            await self._inbox_event.wait()
+        return self._inbox.pop(0)
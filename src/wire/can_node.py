@@ -0,0 +1,130 @@
+# can_node.py
+# Асинхронный узел CAN: приём по прерыванию пачками, диспетчеризация по
+# таблице ID -> обработчик, бинарные команды через struct, очередь отправки
+# с приоритетами.
+import uasyncio as asyncio
+import struct
+
+PRIO_HIGH = 0
+PRIO_NORMAL = 1
+PRIO_LOW = 2
+
+
+class CanNode:
+    """
+    node = CanNode(can)
+    node.on(0x100, '<B', lambda on: led.value(on))
+    node.send(0x100, '<B', 1)
+    node.start()
+    """
+    rx_burst = 16       # сообщений за одно пробуждение задачи приёма
+    poll_ms = 100       # страховочный опрос, если прерывание не пришло
+    retry_ms = 2        # пауза, если аппаратная очередь отправки занята
+
+    def __init__(self, can):
+        self.can = can
+        self._table = {}                      # id -> (handler, struct или None)
+        self._rx_msg = [0, False, False, bytearray(8)]  # переиспользуется recv
+        self._rx_flag = asyncio.ThreadSafeFlag()
+        self._tx_queues = ([], [], [])        # по приоритетам
+        self._tx_event = asyncio.Event()
+        self._tasks = None
+        self.rx_count = 0
+        self.tx_count = 0
+        self.tx_errors = 0                    # кадры, отброшенные при отправке
+        self.dropped = 0                      # сообщения без обработчика
+
+        try: can.irq_recv(self._on_irq)
+        except (AttributeError, OSError): pass
+
+    def _on_irq(self, reason):
+        self._rx_flag.set()
+
+    # --- приём ---
+
+    def on(self, msg_id, fmt, handler):
+        """
+        handler(*values) для сообщений msg_id; fmt - формат struct
+        (распаковка один раз при регистрации) или None - handler(data)
+        """
+        self._table[msg_id] = (handler, struct.Struct(fmt) if fmt else None)
+
+    def off(self, msg_id):
+        self._table.pop(msg_id, None)
+
+    def _dispatch(self, msg_id, data):
+        entry = self._table.get(msg_id)
+        if entry is None:
+            self.dropped += 1
+            return
+        handler, st = entry
+        try:
+            if st is None: handler(data)
+            else: handler(*st.unpack_from(data))
+        except Exception as e:
+            print("CAN handler error:", hex(msg_id), e)
+
+    def drain(self):
+        """Забирает из RX FIFO до rx_burst сообщений"""
+        n = 0
+        msg = self._rx_msg
+        while n < self.rx_burst and self.can.any():
+            self.can.recv(msg)
+            n += 1
+            self._dispatch(msg[0], msg[3])
+        self.rx_count += n
+        return n
+
+    async def _rx(self):
+        while True:
+            try: await asyncio.wait_for_ms(self._rx_flag.wait(), self.poll_ms)
+            except asyncio.TimeoutError: pass
+            while self.drain() == self.rx_burst:
+                await asyncio.sleep_ms(0)    # отдать управление между пачками
+
+    # --- отправка ---
+
+    def send(self, msg_id, fmt, *values, prio=PRIO_NORMAL):
+        """Ставит сообщение в очередь; fmt - формат struct или None (values[0] - байты)"""
+        data = struct.pack(fmt, *values) if fmt else values[0]
+        if len(data) > 8:
+            raise ValueError("CAN payload > 8 bytes")
+        self._tx_queues[prio].append((msg_id, data))
+        self._tx_event.set()
+
+    def _next_tx(self):
+        for q in self._tx_queues:
+            if q: return q.pop(0)
+        return None
+
+    async def _tx(self):
+        while True:
+            await self._tx_event.wait()
+            self._tx_event.clear()
+            msg = self._next_tx()
+            while msg is not None:
+                try:
+                    self.can.send(list(msg[1]), msg[0], timeout=0)
+                    self.tx_count += 1
+                except OSError:
+                    await asyncio.sleep_ms(self.retry_ms)  # мейлбоксы заняты - повторим
+                    continue
+                except Exception as e:
+                    self.tx_errors += 1                    # битый кадр не должен останавливать очередь
+                    print("CAN tx error:", hex(msg[0]), e)
+                msg = self._next_tx()
+
+    def pending(self):
+        return sum(len(q) for q in self._tx_queues)
+
+    # --- задачи ---
+
+    def start(self):
+        if self._tasks is None:
+            self._tasks = (asyncio.create_task(self._rx()), asyncio.create_task(self._tx()))
+        return self._tasks
+
+    def stop(self):
+        if self._tasks:
+            for t in self._tasks: t.cancel()
+        self._tasks = None
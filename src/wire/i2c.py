@@ -3,6 +3,12 @@ import machine
 import network
 import os 
 from machine import Pin, I2C
+import uasyncio as asyncio
+from i2c_regs import I2CDevice, I2CScheduler
+
+# Карта регистров слейва: имя -> (регистр, размер)
+REG_CMD = 0x00
+SLAVE_REGS = {'status': (0x01, 1), 'counter': (0x04, 4)}
 
 def connect_wifi(ssid="TP-Link_0D14", password="24827089"):
     sta = network.WLAN(network.STA_IF); sta.active(True)
@@ -36,22 +42,34 @@ class I2CBundle:
     def button_pressed(self):
         return self.button.value() == 0
 
-    def master_mode(self):
-        """Поведение платы как мастера"""
+    async def watch_button(self, dev):
+        flag = asyncio.ThreadSafeFlag()
+        self.button.irq(lambda p: flag.set(), Pin.IRQ_FALLING)
+        while True:
+            await flag.wait()
+            await asyncio.sleep_ms(20)  # дребезг
+            if not self.button_pressed(): continue
+            try:
+                dev.write(REG_CMD, b'\x01')
+                print("Sent CMD 1")
+            except OSError as e: print("I2C write error:", e)
+
+    async def master_mode(self, period_ms=50):
+        """Поведение платы как мастера: команда по кнопке, опрос регистров слейва"""
+        dev = I2CDevice(self.i2c, self.addr)
+        status = dev.block(SLAVE_REGS)
+        sched = I2CScheduler()
+
+        def on_status(values):
+            self.led.value(values['status'][0] & 1)
+
+        sched.add(status, period_ms, on_status)
+        sched.start()
         try:
-            while True:
-                if self.button_pressed():
-                    msg = b"Hello from master!"
-                    try:
-                        self.i2c.writeto(self.addr, msg)
-                        print("Sent:", msg)
-                        self.led.on()
-                    except Exception as e: print("I2C write error:", e)
-                    
-                    while self.button_pressed(): time.sleep_ms(50)
-                    self.led.off()
-                time.sleep_ms(100)
-        finally: self.i2c.deinit()
+            await self.watch_button(dev)
+        finally:
+            sched.stop()
+            self.i2c.deinit()
 
     def slave_mode(self):
         """Поведение платы как слейва (псевдо — MicroPython не поддерживает полноценный slave I2C)"""
@@ -69,7 +87,7 @@ class I2CBundle:
         print("Master/Slave I2C mode started")
         if self.board == 1:
             print("Running as MASTER")
-            self.master_mode()
+            asyncio.run(self.master_mode())
         else:
             print("Running as SLAVE (emulated)")
             self.slave_mode()
@@ -0,0 +1,133 @@
+# i2c_regs.py
+# Регистровый обмен по I2C: блочные чтения readfrom_mem_into в заранее
+# выделенные буферы, пакетное чтение нескольких регистров (соседние
+# склеиваются в одну транзакцию) и asyncio-планировщик опроса устройств.
+import uasyncio as asyncio
+import time
+
+
+class RegBlock:
+    """
+    Набор регистров устройства, читаемый одним вызовом read().
+    regs: {имя: (регистр, размер)}. Регистры, между которыми не больше gap
+    байт, читаются одной транзакцией; после read() values[имя] - memoryview.
+    """
+    def __init__(self, i2c, addr, regs, gap=4, addrsize=8):
+        self.i2c = i2c
+        self.addr = addr
+        self.addrsize = addrsize
+        self.spans = []                 # [(регистр, буфер)]
+        self.values = {}
+
+        items = sorted(regs.items(), key=lambda kv: kv[1][0])
+        groups = []
+        for name, (reg, size) in items:
+            if groups and reg <= groups[-1][1] + gap:
+                g = groups[-1]
+                g[1] = max(g[1], reg + size)
+                g[2].append((name, reg, size))
+            else:
+                groups.append([reg, reg + size, [(name, reg, size)]])
+        for start, end, members in groups:
+            buf = bytearray(end - start)
+            mv = memoryview(buf)
+            self.spans.append((start, buf))
+            for name, reg, size in members:
+                self.values[name] = mv[reg - start:reg - start + size]
+
+    def read(self):
+        for reg, buf in self.spans:
+            self.i2c.readfrom_mem_into(self.addr, reg, buf, addrsize=self.addrsize)
+        return self.values
+
+    def __getitem__(self, name):
+        return self.values[name]
+
+
+class I2CDevice:
+    def __init__(self, i2c, addr, addrsize=8):
+        self.i2c = i2c
+        self.addr = addr
+        self.addrsize = addrsize
+
+    def block(self, regs, gap=4):
+        return RegBlock(self.i2c, self.addr, regs, gap, self.addrsize)
+
+    def read_into(self, reg, buf):
+        self.i2c.readfrom_mem_into(self.addr, reg, buf, addrsize=self.addrsize)
+        return buf
+
+    def write(self, reg, data):
+        self.i2c.writeto_mem(self.addr, reg, data, addrsize=self.addrsize)
+
+    def write_many(self, writes):
+        """[(регистр, данные)]; подряд идущие регистры - одной транзакцией"""
+        writes = sorted(writes, key=lambda w: w[0])
+        i = 0
+        while i < len(writes):
+            reg, data = writes[i]
+            j = i + 1
+            end = reg + len(data)
+            while j < len(writes) and writes[j][0] == end:
+                end += len(writes[j][1])
+                j += 1
+            if j - i == 1:
+                self.write(reg, data)
+            else:
+                buf = bytearray(end - reg)
+                for r, d in writes[i:j]:
+                    buf[r - reg:r - reg + len(d)] = d
+                self.write(reg, buf)
+            i = j
+
+
+class I2CScheduler:
+    """
+    Опрос нескольких устройств с заданными периодами в одной задаче -
+    транзакции на шине не пересекаются.
+
+    sched = I2CScheduler()
+    sched.add(block, 50, lambda values: ...)
+    sched.start()
+    """
+    def __init__(self):
+        self.jobs = []      # [due_ms, period_ms, block, callback, errors]
+        self._task = None
+
+    def add(self, block, period_ms, callback=None):
+        job = [time.ticks_ms(), period_ms, block, callback, 0]
+        self.jobs.append(job)
+        return job
+
+    def remove(self, job):
+        self.jobs.remove(job)
+
+    async def run(self):
+        while True:
+            if not self.jobs:
+                await asyncio.sleep_ms(100)
+                continue
+            now = time.ticks_ms()
+            job = min(self.jobs, key=lambda j: time.ticks_diff(j[0], now))
+            wait = time.ticks_diff(job[0], now)
+            if wait > 0:
+                await asyncio.sleep_ms(wait)
+            job[0] = time.ticks_add(job[0], job[1])
+            if time.ticks_diff(job[0], time.ticks_ms()) < 0:
+                job[0] = time.ticks_add(time.ticks_ms(), job[1])  # не догоняем пропуски
+            try:
+                values = job[2].read()
+            except OSError:
+                job[4] += 1
+                continue
+            if job[3]: job[3](values)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
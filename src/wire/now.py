@@ -0,0 +1,37 @@
+# now.py - кнопка/светодиод между платами по ESP-NOW, без WiFi и MASTER_IP
+from machine import Pin, unique_id
+import uasyncio as asyncio
+from now_link import NowLink, MSG_USER
+
+LED_PIN = 2; BUTTON_PIN = 0
+MSG_LED = MSG_USER      # payload: 1 байт, 1 - включить
+
+led = Pin(LED_PIN, Pin.OUT)
+button = Pin(BUTTON_PIN, Pin.IN, Pin.PULL_UP)
+link = NowLink('board-' + ''.join('%02x' % b for b in unique_id()[-3:]))
+
+link.on(MSG_LED, lambda mac, payload: led.value(payload[0]))
+link.on_peer = lambda name, mac: print("Peer:", name, mac.hex())
+
+
+async def watch_button():
+    flag = asyncio.ThreadSafeFlag()
+    button.irq(lambda p: flag.set(), Pin.IRQ_FALLING | Pin.IRQ_RISING)
+    pressed = False
+    while True:
+        await flag.wait()
+        await asyncio.sleep_ms(20)  # дребезг
+        now = button.value() == 0
+        if now == pressed: continue
+        pressed = now
+        for name in list(link.peers):
+            ok = await link.send(name, MSG_LED, bytes((now,)))
+            print(f"→ {name}: {int(now)} {'OK' if ok else 'no ack'}")
+
+
+async def main():
+    link.start(sync_ms=1000)
+    print("Peers:", await link.discover())
+    await watch_button()
+
+asyncio.run(main())
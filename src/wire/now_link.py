@@ -0,0 +1,196 @@
+# now_link.py
+# Обмен между платами по ESP-NOW без точки доступа: поиск соседей,
+# бинарные сообщения по типам, подтверждения с повторами и
+# широковещательные импульсы синхронизации времени.
+#
+# Кадр: <BBB type flags seq, далее payload (до 247 байт)
+import uasyncio as asyncio
+import network
+import espnow
+import struct
+import time
+
+BROADCAST = b'\xff' * 6
+HEADER = struct.Struct('<BBB')
+
+# служебные типы, свои начинать с MSG_USER
+MSG_HELLO = 0x01    # payload: имя узла
+MSG_ACK = 0x02      # payload: seq подтверждаемого
+MSG_SYNC = 0x03     # payload: <I ticks_us отправителя
+MSG_USER = 0x10
+
+F_ACK = 0x01        # нужен MSG_ACK
+F_REPLY = 0x02      # ответ на HELLO, повторно не отвечать
+
+
+class NowLink:
+    """
+    link = NowLink('heater')
+    link.on(MSG_USER, lambda mac, payload: ...)
+    link.start()
+    await link.discover()
+    ok = await link.send('portal', MSG_USER, b'\\x01')
+    """
+    ack_ms = 20
+    retries = 3
+
+    def __init__(self, name, channel=None):
+        self.name = name.encode() if isinstance(name, str) else name
+        sta = network.WLAN(network.STA_IF)
+        sta.active(True)
+        if channel is not None and not sta.isconnected():
+            sta.config(channel=channel)
+        self.mac = sta.config('mac')
+        self.e = espnow.ESPNow()
+        self.e.active(True)
+        self._add_peer(BROADCAST)
+
+        self.peers = {}             # имя -> mac
+        self.names = {}             # mac -> имя
+        self.handlers = {}          # тип -> handler(mac, payload)
+        self.on_peer = None         # on_peer(name, mac) при новом соседе
+        self.on_sync = None         # on_sync(mac, offset_us)
+        self.offsets = {}           # mac -> ticks_us соседа минус наш
+
+        self._seq = 0
+        self._last_seq = {}         # mac -> seq последнего принятого (отсев повторов)
+        self._acks = {}             # seq -> Event
+        self._tx = bytearray(250)
+        self._rx_flag = asyncio.ThreadSafeFlag()
+        self._tasks = []
+        self.e.irq(self._on_irq)
+
+    def _on_irq(self, e):
+        self._rx_flag.set()
+
+    def _add_peer(self, mac):
+        try: self.e.add_peer(mac)
+        except OSError: pass        # уже добавлен
+
+    def on(self, msg_type, handler):
+        self.handlers[msg_type] = handler
+
+    def _pack(self, msg_type, flags, seq, payload):
+        n = HEADER.size + len(payload)
+        if n > len(self._tx):
+            raise ValueError("ESP-NOW payload too long")
+        HEADER.pack_into(self._tx, 0, msg_type, flags, seq)
+        self._tx[HEADER.size:n] = payload
+        return memoryview(self._tx)[:n]
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFF
+        return self._seq
+
+    def _resolve(self, peer):
+        if isinstance(peer, (bytes, bytearray)) and len(peer) == 6:
+            return peer
+        mac = self.peers.get(peer)
+        if mac is None:
+            raise KeyError("unknown peer: %s" % peer)
+        return mac
+
+    # --- отправка ---
+
+    def post(self, peer, msg_type, payload=b''):
+        """Без подтверждения; peer - имя, mac или BROADCAST"""
+        mac = self._resolve(peer)
+        self.e.send(mac, self._pack(msg_type, 0, self._next_seq(), payload), False)
+
+    async def send(self, peer, msg_type, payload=b''):
+        """С подтверждением и повторами; True если получатель ответил MSG_ACK"""
+        mac = self._resolve(peer)
+        seq = self._next_seq()
+        event = asyncio.Event()
+        self._acks[seq] = event
+        try:
+            for _ in range(self.retries + 1):
+                self.e.send(mac, self._pack(msg_type, F_ACK, seq, payload), False)
+                try:
+                    await asyncio.wait_for_ms(event.wait(), self.ack_ms)
+                    return True
+                except asyncio.TimeoutError:
+                    pass
+            return False
+        finally:
+            del self._acks[seq]
+
+    async def discover(self, wait_ms=200):
+        """Широковещательный HELLO, ждёт ответы wait_ms; возвращает peers"""
+        self.post(BROADCAST, MSG_HELLO, self.name)
+        await asyncio.sleep_ms(wait_ms)
+        return self.peers
+
+    def sync(self):
+        """Импульс синхронизации: соседи узнают смещение своих ticks_us"""
+        self.post(BROADCAST, MSG_SYNC, struct.pack('<I', time.ticks_us()))
+
+    # --- приём ---
+
+    def _dispatch(self, mac, msg):
+        if len(msg) < HEADER.size: return
+        msg_type, flags, seq = HEADER.unpack_from(msg)
+        payload = memoryview(msg)[HEADER.size:]    # действителен до следующего irecv
+        mac = bytes(mac)
+
+        if msg_type == MSG_ACK:
+            event = self._acks.get(payload[0]) if payload else None
+            if event: event.set()
+            return
+
+        if flags & F_ACK:
+            self._add_peer(mac)
+            self.e.send(mac, self._pack(MSG_ACK, 0, 0, bytes((seq,))), False)
+            if self._last_seq.get(mac) == seq:
+                return              # повтор уже обработанного сообщения
+            self._last_seq[mac] = seq
+
+        if msg_type == MSG_HELLO:
+            self._hello(mac, bytes(payload), flags)
+        elif msg_type == MSG_SYNC:
+            remote, = struct.unpack_from('<I', payload)
+            offset = time.ticks_diff(remote, time.ticks_us())
+            self.offsets[mac] = offset
+            if self.on_sync: self.on_sync(mac, offset)
+        else:
+            handler = self.handlers.get(msg_type)
+            if handler:
+                try: handler(mac, payload)
+                except Exception as e: print("ESP-NOW handler error:", msg_type, e)
+
+    def _hello(self, mac, name, flags):
+        self._add_peer(mac)
+        name = name.decode()
+        known = self.peers.get(name) == mac
+        self.peers[name] = mac
+        self.names[mac] = name
+        if not flags & F_REPLY:
+            self.e.send(mac, self._pack(MSG_HELLO, F_REPLY, self._next_seq(), self.name), False)
+        if not known and self.on_peer:
+            self.on_peer(name, mac)
+
+    async def _rx(self):
+        e = self.e
+        while True:
+            await self._rx_flag.wait()
+            while e.any():
+                mac, msg = e.irecv(0)
+                if mac is None: break
+                self._dispatch(mac, msg)
+
+    async def _sync_loop(self, period_ms):
+        while True:
+            self.sync()
+            await asyncio.sleep_ms(period_ms)
+
+    def start(self, sync_ms=0):
+        """sync_ms > 0 - этот узел рассылает импульсы синхронизации"""
+        if not self._tasks:
+            self._tasks.append(asyncio.create_task(self._rx()))
+            if sync_ms:
+                self._tasks.append(asyncio.create_task(self._sync_loop(sync_ms)))
+        return self._tasks
+
+    def stop(self):
+        for t in self._tasks: t.cancel()
+        self._tasks = []
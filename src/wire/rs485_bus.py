@@ -0,0 +1,243 @@
+# rs485_bus.py
+# Асинхронный драйвер RS485 (полудуплекс, DE по окончанию передачи UART)
+# и бинарный протокол мастер - много слейвов.
+#
+# Кадр: addr func seq len payload[len] crc16_lo crc16_hi
+#   addr - адрес слейва 1..247, 0 - широковещательный (без ответа)
+#   func - код команды, в ответе взведён бит 0x80
+#   seq  - номер запроса, ответ несёт тот же seq
+#   crc  - CRC16/Modbus по всем байтам до него
+from array import array
+import uasyncio as asyncio
+import time
+
+BROADCAST = 0
+RESPONSE = 0x80
+HEADER = 4
+MAX_PAYLOAD = 250
+MAX_FRAME = HEADER + MAX_PAYLOAD + 2
+
+
+def _crc_table():
+    t = array('H', [0] * 256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xA001 if crc & 1 else crc >> 1
+        t[i] = crc
+    return t
+
+_CRC_TABLE = _crc_table()
+
+
+def crc16(buf, n=None):
+    t = _CRC_TABLE
+    crc = 0xFFFF
+    for i in range(len(buf) if n is None else n):
+        crc = (crc >> 8) ^ t[(crc ^ buf[i]) & 0xFF]
+    return crc
+
+
+class RS485:
+    """
+    Транспорт: write() держит DE только на время передачи кадра,
+    read_frame() выдаёт принятые кадры с верным CRC.
+    """
+    gap_ms = 5          # пауза внутри кадра, после которой обрывок отбрасывается
+
+    def __init__(self, uart, de):
+        self.uart = uart
+        self.de = de
+        de.value(0)
+        self._writer = asyncio.StreamWriter(uart, {})
+        self._reader = asyncio.StreamReader(uart)
+        self._tx = bytearray(MAX_FRAME)
+        self._rx = bytearray(MAX_FRAME * 2)
+        self._rx_len = 0
+        self._lock = asyncio.Lock()
+        self.crc_errors = 0
+
+    def pack(self, addr, func, seq, payload=b''):
+        n = len(payload)
+        if n > MAX_PAYLOAD:
+            raise ValueError("RS485 payload > %d bytes" % MAX_PAYLOAD)
+        f = self._tx
+        f[0] = addr; f[1] = func; f[2] = seq & 0xFF; f[3] = n
+        f[HEADER:HEADER + n] = payload
+        crc = crc16(f, HEADER + n)
+        f[HEADER + n] = crc & 0xFF
+        f[HEADER + n + 1] = crc >> 8
+        return memoryview(f)[:HEADER + n + 2]
+
+    async def _wait_tx_done(self):
+        uart = self.uart
+        if hasattr(uart, 'txdone'):
+            while not uart.txdone():
+                await asyncio.sleep_ms(0)
+        else:
+            uart.flush()    # блокирует до ухода последнего стоп-бита
+
+    async def write(self, addr, func, seq, payload=b''):
+        async with self._lock:
+            frame = self.pack(addr, func, seq, payload)
+            self.de.value(1)
+            try:
+                self._writer.write(frame)
+                await self._writer.drain()
+                await self._wait_tx_done()
+            finally:
+                self.de.value(0)
+
+    def _parse(self):
+        """Ищет кадр в начале буфера. None - нужно больше данных"""
+        buf = self._rx
+        while self._rx_len >= HEADER + 2:
+            n = buf[3]
+            size = HEADER + n + 2
+            if n > MAX_PAYLOAD:
+                self._drop(1)
+                continue
+            if self._rx_len < size:
+                return None
+            crc = buf[size - 2] | (buf[size - 1] << 8)
+            if crc != crc16(buf, size - 2):
+                self.crc_errors += 1
+                self._drop(1)           # ресинхронизация по байту
+                continue
+            frame = (buf[0], buf[1], buf[2], bytes(buf[HEADER:HEADER + n]))
+            self._drop(size)
+            return frame
+        return None
+
+    def _drop(self, k):
+        rest = self._rx_len - k
+        self._rx[0:rest] = self._rx[k:self._rx_len]
+        self._rx_len = rest
+
+    async def read_frame(self):
+        """(addr, func, seq, payload)"""
+        while True:
+            frame = self._parse()
+            if frame is not None:
+                return frame
+            if self._rx_len == len(self._rx):
+                self._drop(1)
+            read = self._reader.read(len(self._rx) - self._rx_len)
+            if not self._rx_len:
+                data = await read
+            else:
+                # обрывок кадра (или мусорный байт длины): ждём не дольше паузы
+                try: data = await asyncio.wait_for_ms(read, self.gap_ms)
+                except asyncio.TimeoutError:
+                    self._drop(1)
+                    continue
+            n = len(data)
+            self._rx[self._rx_len:self._rx_len + n] = data
+            self._rx_len += n
+
+
+class RS485Master:
+    """
+    Запросы из разных задач встают в очередь на шину: следующий кадр уходит
+    сразу после ответа (или таймаута) предыдущего, без фиксированных пауз.
+    Ответы сверяются по (addr, seq), запоздавшие ответы отбрасываются.
+
+    master = RS485Master(RS485(uart, de))
+    master.start()
+    data = await master.request(5, 0x01, b'')
+    """
+    timeout_ms = 30     # по умолчанию на ответ слейва
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.timeouts = {}          # addr -> мс
+        self.stats = {}             # addr -> [ok, timeouts, rtt_us последнего]
+        self._seq = 0
+        self._turn = asyncio.Lock()
+        self._pending = None        # (addr, seq, event, [ответ])
+        self._task = None
+
+    def set_timeout(self, addr, ms):
+        self.timeouts[addr] = ms
+
+    def _stat(self, addr):
+        s = self.stats.get(addr)
+        if s is None:
+            s = self.stats[addr] = [0, 0, 0]
+        return s
+
+    async def request(self, addr, func, payload=b'', timeout_ms=None):
+        """Возвращает (func, payload) ответа; asyncio.TimeoutError если слейв молчит"""
+        async with self._turn:
+            self._seq = (self._seq + 1) & 0xFF
+            seq = self._seq
+            if addr == BROADCAST:
+                await self.bus.write(addr, func, seq, payload)
+                return None
+            event = asyncio.Event()
+            self._pending = (addr, seq, event, [None])
+            stat = self._stat(addr)
+            t0 = time.ticks_us()
+            try:
+                await self.bus.write(addr, func, seq, payload)
+                ms = timeout_ms or self.timeouts.get(addr, self.timeout_ms)
+                try:
+                    await asyncio.wait_for_ms(event.wait(), ms)
+                except asyncio.TimeoutError:
+                    stat[1] += 1
+                    raise
+                stat[0] += 1
+                stat[2] = time.ticks_diff(time.ticks_us(), t0)
+                return self._pending[3][0]
+            finally:
+                self._pending = None
+
+    async def poll(self, requests):
+        """Опрос списка (addr, func, payload); результат или None на таймаут"""
+        res = []
+        for addr, func, payload in requests:
+            try: res.append(await self.request(addr, func, payload))
+            except asyncio.TimeoutError: res.append(None)
+        return res
+
+    async def run(self):
+        while True:
+            addr, func, seq, payload = await self.bus.read_frame()
+            p = self._pending
+            if p and p[0] == addr and p[1] == seq and func & RESPONSE:
+                p[3][0] = (func & 0x7F, payload)
+                p[2].set()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+
+class RS485Slave:
+    """
+    slave = RS485Slave(RS485(uart, de), addr=5)
+    slave.on(0x01, lambda payload: b'OK')
+    await slave.run()
+    """
+    def __init__(self, bus, addr):
+        self.bus = bus
+        self.addr = addr
+        self.handlers = {}          # func -> handler(payload) -> bytes ответа
+
+    def on(self, func, handler):
+        self.handlers[func] = handler
+
+    async def run(self):
+        while True:
+            addr, func, seq, payload = await self.bus.read_frame()
+            if func & RESPONSE or (addr != self.addr and addr != BROADCAST):
+                continue
+            handler = self.handlers.get(func)
+            try:
+                resp = handler(payload) if handler else None
+            except Exception as e:
+                print("RS485 handler error:", func, e)
+                resp = None
+            if addr != BROADCAST and handler:
+                await self.bus.write(self.addr, func | RESPONSE, seq, resp or b'')
@@ -0,0 +1,98 @@
+# uart_link.py
+# Канальный уровень поверх UART: asyncio StreamReader/StreamWriter,
+# бинарные сообщения в кадрах COBS с разделителем 0x00.
+# Буферы выделяются один раз, приём без аллокаций на сообщение.
+import uasyncio as asyncio
+
+
+def cobs_encode(src, dst):
+    """Кодирует src в dst (len(dst) >= len(src) + len(src)//254 + 2), возвращает длину с 0x00"""
+    code_pos = 0
+    out = 1
+    code = 1
+    for b in src:
+        if b:
+            dst[out] = b
+            out += 1
+            code += 1
+            if code < 0xFF:
+                continue
+        dst[code_pos] = code
+        code_pos = out
+        out += 1
+        code = 1
+    dst[code_pos] = code
+    dst[out] = 0
+    return out + 1
+
+
+def cobs_decode(buf, n):
+    """Декодирует buf[:n] на месте (без разделителя), возвращает длину или -1"""
+    i = 0
+    out = 0
+    while i < n:
+        code = buf[i]
+        if code == 0 or i + code > n:
+            return -1
+        i += 1
+        for _ in range(code - 1):
+            buf[out] = buf[i]
+            out += 1
+            i += 1
+        if code < 0xFF and i < n:
+            buf[out] = 0
+            out += 1
+    return out
+
+
+class UartLink:
+    """
+    link = UartLink(uart)
+    await link.send(b'\\x01\\x02')
+    msg = await link.recv()     # memoryview, действителен до следующего recv()
+    """
+    def __init__(self, uart, max_msg=128):
+        self.max_msg = max_msg
+        self._reader = asyncio.StreamReader(uart)
+        self._writer = asyncio.StreamWriter(uart, {})
+        self._tx = bytearray(max_msg + max_msg // 254 + 2)
+        self._frame = bytearray(max_msg + max_msg // 254 + 1)
+        self._frame_len = 0
+        self._chunk = bytearray(64)
+        self._chunk_pos = 0
+        self._chunk_len = 0
+        self._lock = asyncio.Lock()
+        self.errors = 0
+
+    async def send(self, payload):
+        if len(payload) > self.max_msg:
+            raise ValueError("message > %d bytes" % self.max_msg)
+        async with self._lock:
+            n = cobs_encode(payload, self._tx)
+            self._writer.write(memoryview(self._tx)[:n])
+            await self._writer.drain()
+
+    async def recv(self):
+        frame = self._frame
+        while True:
+            if self._chunk_pos == self._chunk_len:
+                self._chunk_len = await self._reader.readinto(self._chunk)
+                self._chunk_pos = 0
+            chunk = self._chunk
+            for i in range(self._chunk_pos, self._chunk_len):
+                b = chunk[i]
+                if b:
+                    if self._frame_len < len(frame):
+                        frame[self._frame_len] = b
+                    self._frame_len += 1    # переполнение заметим по длине
+                    continue
+                self._chunk_pos = i + 1
+                n = self._frame_len
+                self._frame_len = 0
+                if n == 0: continue
+                n = cobs_decode(frame, n) if n <= len(frame) else -1
+                if n < 0:
+                    self.errors += 1
+                    continue
+                return memoryview(frame)[:n]
+            self._chunk_pos = self._chunk_len
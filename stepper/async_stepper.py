@@ -8,12 +8,12 @@ async def main():
     sr1 = AsyncStepper(en_pin=Pin(2, Pin.OUT, drive=Pin.DRIVE_3),
                        step_pin=Pin(16, Pin.OUT, drive=Pin.DRIVE_3),
                        dir_pin=Pin(4, Pin.OUT, drive=Pin.DRIVE_3),
-                       steps_per_sec=5000, invert_enable=True)
+                       steps_per_sec=5000, invert_enable=True, accel=20000)
 
     sr2 = AsyncStepper(en_pin=Pin(13, Pin.OUT, drive=Pin.DRIVE_3),
                        step_pin=Pin(14, Pin.OUT, drive=Pin.DRIVE_3),
                        dir_pin=Pin(15, Pin.OUT, drive=Pin.DRIVE_3),
-                       steps_per_sec=5000, invert_enable=True)
+                       steps_per_sec=5000, invert_enable=True, accel=20000)
 
     sr1.free_run(1)
     sr2.free_run(1)
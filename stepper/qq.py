@@ -1,9 +1,32 @@
 import math
 import machine
+import time
+from array import array
+
+
+def ramp_table(max_sps, accel, start_sps=None):
+    """
+    Периоды шагов (мкс) при разгоне с постоянным ускорением accel (шаг/с²):
+    v_i = sqrt(v0² + 2·a·i), от start_sps до max_sps. Индекс - номер шага
+    разгона; столько же шагов нужно, чтобы остановиться с этой скорости.
+    """
+    if start_sps is None:
+        start_sps = min(max_sps, math.sqrt(2 * accel))     # скорость после первого шага
+    periods = []
+    v2 = start_sps * start_sps
+    while True:
+        v = math.sqrt(v2)
+        if v >= max_sps:
+            periods.append(round(1_000_000 / max_sps))
+            break
+        periods.append(round(1_000_000 / v))
+        v2 += 2 * accel
+    return array('I', periods)
+
 
 class Stepper:
     def __init__(self, step_pin=14, dir_pin=15, en_pin=13, steps_per_rev=200,
-                 speed_sps=10, invert_dir=False, invert_enable=False, timer_id=-1):
+                 speed_sps=10, invert_dir=False, invert_enable=False, timer_id=-1, accel=None):
 
         if not isinstance(step_pin, machine.Pin):
             step_pin = machine.Pin(step_pin, machine.Pin.OUT, drive=machine.Pin.DRIVE_3)
@@ -18,7 +41,9 @@ class Stepper:
         self.invert_dir = invert_dir
         self.invert_enable = invert_enable
 
-        self.timer = machine.Timer(timer_id)
+        # timer_id=None - шагами управляет StepperGroup
+        self.timer = machine.Timer(timer_id) if timer_id is not None else None
+        self.group = None
         self.timer_is_running = False
         self.free_run_mode = 0
         self.enabled = True
@@ -29,19 +54,39 @@ class Stepper:
         self.steps_per_sec = speed_sps
         self.steps_per_rev = steps_per_rev
 
-        self.track_target()
+        self.accel = accel
+        self.ramp = None
+        self._ramp_i = 0         # текущая ступень разгона
+        self._dir = 0            # направление последнего шага
+        self._build_ramp()
+
+        if self.timer is not None: self.track_target()
+
+    def _build_ramp(self):
+        self._period_us = round(1_000_000 / self.steps_per_sec)
+        self.ramp = ramp_table(self.steps_per_sec, self.accel) if self.accel else None
+        self._ramp_i = 0
 
     def speed(self, sps):
         self.steps_per_sec = sps
+        self._build_ramp()
         if self.timer_is_running:
             self.track_target()
 
+    def acceleration(self, accel):
+        """Шаг/с²; None - без разгона, сразу steps_per_sec"""
+        self.accel = accel
+        self._build_ramp()
+
     def speed_rps(self, rps):
         self.speed(rps * self.steps_per_rev)
 
     def target(self, t):
         self.target_reached = False
         self.target_pos = t
+        if self.group is not None: self.group.kick()
+        elif self.timer is not None and not self.timer_is_running and not self.free_run_mode:
+            self.track_target()
 
     def target_deg(self, deg):
         self.target(round(self.steps_per_rev * deg / 360.0))
@@ -69,32 +114,87 @@ class Stepper:
             self.step_value_func(0)
         self.pos += 1 if (d > 0) else -1
 
+    def _advance(self):
+        """
+        Один шаг движения. Возвращает период до следующего шага в мкс,
+        0 - цель достигнута и таймер можно остановить.
+        """
+        ramp = self.ramp
+        i = self._ramp_i
+        if self.free_run_mode:
+            d = 1 if self.free_run_mode > 0 else -1
+            rem = 1 << 30
+        else:
+            rem = self.target_pos - self.pos
+            if rem == 0 and (ramp is None or i == 0):
+                self.target_reached = True
+                self._dir = 0
+                return 0
+            d = (1 if rem > 0 else -1) if rem else self._dir
+            rem = abs(rem)
+
+        if ramp is None:
+            self.step(d)
+            return self._period_us
+
+        if self._dir and d != self._dir and i > 0:
+            # цель сменила сторону на ходу: сначала тормозим в прежнем направлении
+            d = self._dir
+            rem = 0
+        self.step(d)
+        self._dir = d
+        rem -= 1
+        if rem <= i: i -= 1                 # пора тормозить
+        elif i < len(ramp) - 1: i += 1      # разгон
+        if i < 0: i = 0
+        self._ramp_i = i
+        return ramp[i]
+
     def _timer_callback(self, t):
-        if self.free_run_mode > 0: self.step(1)
-        elif self.free_run_mode < 0: self.step(-1)
-        elif self.target_pos > self.pos: self.step(1)
-        elif self.target_pos < self.pos: self.step(-1)
-        else: self.target_reached = True
+        period = self._advance()
+        if not period:
+            self._halt()
+        elif self.ramp is not None:
+            self.timer.init(mode=machine.Timer.ONE_SHOT, freq=1_000_000 / period,
+                            callback=self._timer_callback)
+
+    def _halt(self):
+        if self.timer_is_running: self.timer.deinit()
+        self.timer_is_running = False
+        self._ramp_i = 0
+
+    def _start_timer(self):
+        if self.group is not None:
+            self.group.kick()
+            return
+        if self.timer_is_running: self.timer.deinit()
+        if self.ramp is not None:
+            # переменный период: ONE_SHOT перезаряжается по таблице разгона
+            self.timer.init(mode=machine.Timer.ONE_SHOT, freq=1_000_000 / self.ramp[self._ramp_i],
+                            callback=self._timer_callback)
+        else:
+            self.timer.init(freq=self.steps_per_sec, callback=self._timer_callback)
+        self.timer_is_running = True
 
     def free_run(self, d):
         self.free_run_mode = d
-        if self.timer_is_running: self.timer.deinit()
         if d != 0:
-            self.timer.init(freq=self.steps_per_sec, callback=self._timer_callback)
-            self.timer_is_running = True
+            self._start_timer()
         else:
+            if self.group is None: self._halt()
             self.dir_value_func(0)
 
     def track_target(self):
         self.free_run_mode = 0
-        if self.timer_is_running: self.timer.deinit()
-        self.timer.init(freq=self.steps_per_sec, callback=self._timer_callback)
-        self.timer_is_running = True
+        self._start_timer()
 
     def stop(self):
         self.free_run_mode = 0
-        if self.timer_is_running: self.timer.deinit()
-        self.timer_is_running = False
+        if self.group is not None:
+            self.target_pos = self.pos      # в группе таймер общий - просто стоим
+            self.target_reached = True
+        self._halt()
+        self._dir = 0
         self.dir_value_func(0)
 
     def enable(self, e):
@@ -119,6 +219,68 @@ class Stepper:
 
     class StepperEngineError(Exception):
         def __init__(self, message): super().__init__(message)
+
+
+class StepperGroup:
+    """
+    Несколько моторов на одном аппаратном таймере: у каждого свой момент
+    следующего шага (ticks_us), таймер в режиме ONE_SHOT заводится на
+    ближайший из них. Когда все цели достигнуты, таймер останавливается.
+
+    group = StepperGroup(0, [Stepper(14, 15, 13, timer_id=None, accel=2000), ...])
+    """
+    slack_us = 20       # шаги, которым осталось меньше, делаются в этом же прерывании
+    min_delay_us = 50
+
+    def __init__(self, timer_id, motors=()):
+        self.timer = machine.Timer(timer_id)
+        self.running = False
+        self.motors = []
+        self.due = []
+        for m in motors: self.add(m)
+
+    def add(self, motor):
+        motor.group = self
+        self.motors.append(motor)
+        self.due.append(time.ticks_us())
+
+    def remove(self, motor):
+        i = self.motors.index(motor)
+        del self.motors[i]
+        del self.due[i]
+        motor.group = None
+
+    def kick(self):
+        """Запускает таймер, если он стоит (новая цель или free_run)"""
+        if self.running: return
+        now = time.ticks_us()
+        for i in range(len(self.due)): self.due[i] = now
+        self.running = True
+        self._arm(self.min_delay_us)
+
+    def _arm(self, delay_us):
+        self.timer.init(mode=machine.Timer.ONE_SHOT, freq=1_000_000 / delay_us,
+                        callback=self._callback)
+
+    def _callback(self, t):
+        now = time.ticks_us()
+        nearest = None
+        for i, m in enumerate(self.motors):
+            if m.target_reached and not m.free_run_mode:
+                continue
+            if time.ticks_diff(self.due[i], now) <= self.slack_us:
+                period = m._advance()
+                if not period: continue
+                # от запланированного момента, а не от фактического - без накопления опозданий
+                self.due[i] = time.ticks_add(self.due[i], period)
+                if time.ticks_diff(self.due[i], now) < 0: self.due[i] = time.ticks_add(now, period)
+            wait = time.ticks_diff(self.due[i], now)
+            if nearest is None or wait < nearest: nearest = wait
+        if nearest is None:
+            self.timer.deinit()
+            self.running = False
+            return
+        self._arm(max(self.min_delay_us, time.ticks_diff(time.ticks_add(now, nearest), time.ticks_us())))
         
         
         
@@ -157,6 +319,13 @@ motor.target_rad(motor.get_pos_rad() + 1.0)
 while not motor.is_target_reached(): time.sleep(0.01)
 print("Готово, позиция:", motor.get_pos_rad(), "рад")
 
+print("Тест 6: 10 оборотов с разгоном 2000 шаг/с² до 2000 шаг/с")
+motor.speed(2000)
+motor.acceleration(2000)
+motor.target(motor.get_pos() + 10 * motor.steps_per_rev)
+while not motor.is_target_reached(): time.sleep(0.01)
+print("Готово, позиция:", motor.get_pos(), "таймер работает:", motor.timer_is_running)
+
 motor.stop()
 motor.enable(True)
 print("Отключено")
@@ -1,9 +1,20 @@
 import uasyncio as asyncio
 from machine import Pin
+import math
+import time
 
 class AsyncStepper:
+    """
+    Шаги выдаются пачками: за один проход задачи делаются все шаги, чей
+    момент (по ticks_us) уже наступил, поэтому средняя скорость держится
+    при любой загрузке планировщика. accel (шаг/с²) включает разгон и
+    торможение перед целью; None - сразу target_speed.
+    """
+    max_burst = 64          # шагов за один проход, дальше отдаём управление
+    yield_us = 2000         # если до шага дольше - спим, иначе sleep(0)
+
     def __init__(self, step_pin, dir_pin, en_pin=None, steps_per_sec=200,
-                 invert_dir=False, invert_enable=False, accel=1000, max_speed=None):
+                 invert_dir=False, invert_enable=False, accel=None, max_speed=None):
         if not isinstance(step_pin, Pin): 
             step_pin = Pin(step_pin, Pin.OUT)
         if not isinstance(dir_pin, Pin): 
@@ -14,10 +25,10 @@ class AsyncStepper:
 
         self.invert_dir = invert_dir
         self.invert_enable = invert_enable
-        self.steps_per_sec = steps_per_sec   # стартовая скорость
+        self.steps_per_sec = steps_per_sec   # скорость по умолчанию
         self.target_speed = steps_per_sec    # к какой скорости идем
         self.max_speed = max_speed or steps_per_sec
-        self.accel = accel                   # шагов/сек²
+        self.accel = accel                   # шагов/сек², None - без разгона
 
         self.current_speed = 0               # текущая скорость (шаг/сек)
         self.enabled = True
@@ -53,28 +64,58 @@ class AsyncStepper:
             self.target_speed = self.steps_per_sec
         self.start_task()
 
+    def _next_speed(self, remaining):
+        """Скорость для следующего шага; remaining - шагов до цели (None - free run)"""
+        v = self.current_speed
+        a = self.accel
+        if not a: return self.target_speed
+        v_min = math.sqrt(2 * a)             # скорость после первого шага с места
+        if remaining is not None and v * v >= 2 * a * remaining:
+            v = math.sqrt(max(v * v - 2 * a, 0))     # торможение к цели
+        elif v < self.target_speed:
+            v = min(math.sqrt(v * v + 2 * a), self.target_speed)
+        elif v > self.target_speed:
+            v = max(math.sqrt(max(v * v - 2 * a, 0)), self.target_speed)
+        return max(v, min(v_min, self.target_speed))
+
     async def _run(self):
         try:
+            due = time.ticks_us()
             while self.enabled and (self.free_run_mode != 0 or not self.target_reached):
-                # разгон / торможение
-                if self.current_speed < self.target_speed:
-                    self.current_speed = min(self.current_speed + self.accel/ self.target_speed, self.target_speed)
-                elif self.current_speed > self.target_speed:
-                    self.current_speed = max(self.current_speed - self.accel/ self.target_speed, self.target_speed)
-
-                if self.current_speed <= 0:
-                    await asyncio.sleep(0)  # холостая итерация
+                now = time.ticks_us()
+                wait = time.ticks_diff(due, now)
+                if wait > self.yield_us:
+                    await asyncio.sleep_ms(wait // 1000)
+                    continue
+                if wait > 0:
+                    await asyncio.sleep(0)
                     continue
 
-                # шаг
-                if self.free_run_mode > 0:          self.step(1)
-                elif self.free_run_mode < 0:        self.step(-1)
-                elif self.target_pos > self.pos:    self.step(1)
-                elif self.target_pos < self.pos:    self.step(-1)
-                else: self.target_reached = True
-
-                # задержка = 1 / скорость
-                await asyncio.sleep(1 / self.current_speed)
+                # пачка: все шаги, чей момент уже прошёл
+                n = 0
+                while time.ticks_diff(due, now) <= 0 and n < self.max_burst:
+                    if self.free_run_mode:
+                        d = 1 if self.free_run_mode > 0 else -1
+                        remaining = None
+                    else:
+                        delta = self.target_pos - self.pos
+                        if delta == 0:
+                            self.target_reached = True
+                            self.current_speed = 0
+                            break
+                        d = 1 if delta > 0 else -1
+                        remaining = abs(delta)
+                    self.current_speed = self._next_speed(remaining)
+                    if self.current_speed <= 0:
+                        break
+                    self.step(d)
+                    due = time.ticks_add(due, int(1_000_000 / self.current_speed))
+                    n += 1
+
+                if n == self.max_burst:
+                    # не успеваем - не копим долг бесконечно
+                    due = time.ticks_add(time.ticks_us(), int(1_000_000 / self.current_speed))
+                await asyncio.sleep_ms(0 if n else 1)
         except asyncio.CancelledError: 
             pass
         finally:
@@ -89,11 +130,12 @@ class AsyncStepper:
             self._task.cancel()
             self._task = None
         self.free_run_mode = 0
+        self.current_speed = 0
         self.enable(False)
 
-
 sr1 = AsyncStepper(en_pin=Pin(2, Pin.OUT, drive=Pin.DRIVE_3), step_pin=Pin(16, Pin.OUT, drive=Pin.DRIVE_3),
-                    dir_pin=Pin(4, Pin.OUT, drive=Pin.DRIVE_3), steps_per_sec=5000, invert_enable=True)
+                    dir_pin=Pin(4, Pin.OUT, drive=Pin.DRIVE_3), steps_per_sec=5000, invert_enable=True,
+                    accel=20000)
 
 async def main():
     sr1.free_run(1, speed=5000)